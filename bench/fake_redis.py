@@ -0,0 +1,135 @@
+# Minimalny serwer zgodny z protokołem Redisa (RESP2) do testów STATE_BACKEND=redis bez prawdziwego Redisa.
+#
+#   python -m bench.fake_redis --port 16379
+#
+# Obsługuje: HELLO (RESP2/RESP3), PING, GET, SET [NX|XX] [EX s|PX ms], DEL, EXISTS, TTL, FLUSHALL, DBSIZE, CLIENT, SELECT.
+import argparse
+import asyncio
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class FakeRedis:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.data = {}
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, command, *args):
+        command = command.upper()
+        if command == b"PING":
+            return args[0] if args else "+PONG"
+        if command in (b"CLIENT", b"SELECT"):
+            return "+OK"
+        if command == b"GET":
+            return self._get(args[0])
+        if command == b"SET":
+            return self._set(args[0], args[1], [a.upper() for a in args[2:]], args[2:])
+        if command == b"DEL":
+            return sum(1 for key in args if self._get(key) is not None and self.data.pop(key))
+        if command == b"EXISTS":
+            return sum(1 for key in args if self._get(key) is not None)
+        if command == b"TTL":
+            if self._get(args[0]) is None:
+                return -2
+            expires_at = self.data[args[0]][1]
+            return -1 if expires_at is None else max(0, int(expires_at - self.clock() + 0.5))
+        if command == b"FLUSHALL":
+            self.data.clear()
+            return "+OK"
+        if command == b"DBSIZE":
+            return len(self.data)
+        return Exception(f"ERR unknown command '{command.decode(errors='replace')}'")
+
+    def _set(self, key, value, options, raw):
+        expires_at = None
+        if b"EX" in options:
+            expires_at = self.clock() + int(raw[options.index(b"EX") + 1])
+        elif b"PX" in options:
+            expires_at = self.clock() + int(raw[options.index(b"PX") + 1]) / 1000
+        exists = self._get(key) is not None
+        if (b"NX" in options and exists) or (b"XX" in options and not exists):
+            return None
+        self.data[key] = (value, expires_at)
+        return "+OK"
+
+
+def encode(value, protocol=2):
+    if value is None:
+        return b"_\r\n" if protocol == 3 else b"$-1\r\n"
+    if isinstance(value, dict):
+        items = b"".join(encode(k, protocol) + encode(v, protocol) for k, v in value.items())
+        prefix = b"%%%d\r\n" if protocol == 3 else b"*%d\r\n"
+        return prefix % (len(value) * (1 if protocol == 3 else 2)) + items
+    if isinstance(value, Exception):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, str):
+        return f"{value}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def read_command(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+async def serve(store, host, port):
+    async def handle(reader, writer):
+        protocol = 2
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                if args[0].upper() == b"HELLO":
+                    protocol = int(args[1]) if len(args) > 1 else protocol
+                    reply = {b"server": b"fake-redis", b"version": b"7.0.0", b"proto": protocol}
+                else:
+                    reply = store.execute(*args)
+                writer.write(encode(reply, protocol))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    log.info("Atrapa Redisa: %s:%d", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atrapa serwera Redis do testów")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=16379)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(FakeRedis(), args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
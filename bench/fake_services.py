@@ -0,0 +1,380 @@
+# Lokalne atrapy PumpPortal (WebSocket), Helius (JSON-RPC) i Telegram Bot API do benchmarków.
+#
+#   python -m bench.fake_services --http-port 18080 --ws-port 18081 --helius-latency-ms 50
+#
+# Sterowanie przez HTTP:
+#   POST /_bench/stream {"rate": 1000, "duration": 10}  – nadawanie zdarzeń create
+#   GET  /_bench/stats                                   – liczniki i czasy wysłania/dostarczenia mintów
+#   POST /_bench/reset                                   – zerowanie liczników
+#
+# WebSocket obsługuje też klientów logsSubscribe (INGEST_SOURCE=solana): dostają te same zdarzenia
+# jako logsNotification z zakodowanymi CreateEvent/TradeEvent programu pump.fun.
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import random
+import re
+import struct
+import time
+
+import websockets
+from aiohttp import web
+
+from dedup import b58decode_pubkey, b58encode
+from solana_ingest import CREATE_EVENT, LAMPORTS_PER_SOL, PUMP_PROGRAM_ID, TOKEN_DECIMALS, TRADE_EVENT
+
+log = logging.getLogger(__name__)
+
+MINT_RE = re.compile(r"address=([1-9A-HJ-NP-Za-km-z]{32,44})")
+
+
+def random_pubkey(rng):
+    return b58encode(rng.getrandbits(256).to_bytes(32, "big"))
+
+
+def _stable_fraction(value, salt):
+    digest = hashlib.blake2b(f"{salt}:{value}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+def _borsh_string(value):
+    raw = value.encode()
+    return struct.pack("<I", len(raw)) + raw
+
+
+def encode_logs(event):
+    # Logi transakcji pump.fun odpowiadające zdarzeniu PumpPortal (create + initial buy albo sam buy)
+    mint = b58decode_pubkey(event["mint"])
+    user = b58decode_pubkey(event["traderPublicKey"])
+    token_amount = int(round(event.get("initialBuy", event.get("tokenAmount", 0)) * TOKEN_DECIMALS))
+    sol_amount = int(round(event.get("solAmount", 0) * LAMPORTS_PER_SOL))
+    v_tokens = int(event.get("vTokensInBondingCurve", 1_073_000_000) * TOKEN_DECIMALS)
+    v_sol = int(event.get("vSolInBondingCurve", 30) * LAMPORTS_PER_SOL)
+    trade = TRADE_EVENT + mint + struct.pack("<QQ?", sol_amount, token_amount, True) + user + struct.pack(
+        "<qQQ", int(time.time()), v_sol, v_tokens,
+    )
+    logs = [f"Program {PUMP_PROGRAM_ID} invoke [1]"]
+    if event.get("txType") == "create":
+        curve = b58decode_pubkey(event.get("bondingCurveKey") or event["mint"])
+        create = (
+            CREATE_EVENT + _borsh_string(event.get("name", "")) + _borsh_string(event.get("symbol", ""))
+            + _borsh_string(event.get("uri", "")) + mint + curve + user + user
+            + struct.pack("<qQQ", int(time.time()), 1_073_000_000 * TOKEN_DECIMALS, 30 * LAMPORTS_PER_SOL)
+        )
+        logs += ["Program log: Instruction: Create", "Program data: " + base64.b64encode(create).decode()]
+    logs += ["Program log: Instruction: Buy", "Program data: " + base64.b64encode(trade).decode(),
+             f"Program {PUMP_PROGRAM_ID} success"]
+    return logs
+
+
+# Pola searchAssets akceptowane przez atrapę (podzbiór API DAS)
+SEARCH_ASSETS_FIELDS = {
+    "ownerAddress", "creatorAddress", "creatorVerified", "authorityAddress", "grouping", "tokenType",
+    "interface", "compressed", "burnt", "page", "limit", "before", "after", "sortBy", "options",
+}
+
+class FakeServices:
+    def __init__(self, helius_latency=0.05, helius_jitter=0.02, helius_error_rate=0.0, helius_429_rate=0.0,
+                 telegram_latency=0.02, telegram_429_rate=0.0, dev_token_ratio=0.5, pass_ratio=0.3,
+                 dev_pool=5000, non_create_ratio=0.0, replay=None, seed=1):
+        self.helius_latency = helius_latency
+        self.helius_jitter = helius_jitter
+        self.helius_error_rate = helius_error_rate
+        self.helius_429_rate = helius_429_rate
+        self.telegram_latency = telegram_latency
+        self.telegram_429_rate = telegram_429_rate
+        self.dev_token_ratio = dev_token_ratio
+        self.pass_ratio = pass_ratio
+        self.non_create_ratio = non_create_ratio
+        self.rng = random.Random(seed)
+        self.devs = [random_pubkey(self.rng) for _ in range(dev_pool)]
+        self.replay = itertools.cycle(replay) if replay else None
+        self.clients = set()
+        self.solana_clients = {}
+        self.slot = 0
+        self.message_ids = itertools.count(1)
+        self._stream_task = None
+        self.reset()
+
+    def reset(self):
+        self.sent_at = {}
+        self.delivered_at = {}
+        self.frames_sent = 0
+        self.helius_requests = 0
+        self.helius_calls = {}
+        self.helius_429s = 0
+        self.helius_errors = 0
+        self.telegram_messages = 0
+        self.telegram_429s = 0
+
+    # --- PumpPortal ---
+
+    def next_frame(self):
+        rng = self.rng
+        if self.non_create_ratio and rng.random() < self.non_create_ratio:
+            # Kupna i sprzedaże portfeli z puli dev'ów – sprzedaże karmią pre-warming
+            event = {"txType": rng.choice(("buy", "sell")), "mint": random_pubkey(rng),
+                     "traderPublicKey": rng.choice(self.devs),
+                     "solAmount": rng.uniform(0.01, 3)}
+            return event, None
+
+        if self.replay:
+            event = dict(next(self.replay))
+            event["mint"] = random_pubkey(rng)
+        else:
+            if rng.random() < self.pass_ratio:
+                initial_buy = rng.randint(2, 10) * 10_000_000
+                sol_amount = rng.randint(1, 3) + rng.uniform(-0.01, 0.01)
+            else:
+                initial_buy = rng.uniform(0, 5) * 10_000_000 + 3_700_000
+                sol_amount = rng.uniform(0.1, 3) + 0.3
+            event = {
+                "signature": b58encode(rng.getrandbits(512).to_bytes(64, "big")),
+                "mint": random_pubkey(rng),
+                "traderPublicKey": rng.choice(self.devs),
+                "txType": "create",
+                "initialBuy": initial_buy,
+                "solAmount": sol_amount,
+                "bondingCurveKey": random_pubkey(rng),
+                "vTokensInBondingCurve": 1_000_000_000 - initial_buy,
+                "vSolInBondingCurve": 30 + sol_amount,
+                "marketCapSol": 30.0,
+                "name": "Bench Token",
+                "symbol": "BENCH",
+                "uri": "https://example.invalid/meta.json",
+                "pool": "pump",
+            }
+        return event, event["mint"]
+
+    async def ws_handler(self, websocket):
+        request = json.loads(await websocket.recv())
+        if request.get("method") == "logsSubscribe":
+            # Atrapa RPC WebSocket Solany: potwierdzenie subskrypcji, potem logsNotification
+            subscription = len(self.solana_clients) + 1
+            await websocket.send(json.dumps({"jsonrpc": "2.0", "result": subscription, "id": request.get("id")}))
+            self.solana_clients[websocket] = subscription
+        else:
+            self.clients.add(websocket)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.clients.discard(websocket)
+            self.solana_clients.pop(websocket, None)
+
+    def logs_notification(self, event, subscription):
+        self.slot += 1
+        return json.dumps({"jsonrpc": "2.0", "method": "logsNotification", "params": {
+            "result": {"context": {"slot": self.slot}, "value": {
+                "signature": event.get("signature") or b58encode(self.rng.getrandbits(512).to_bytes(64, "big")),
+                "err": None,
+                "logs": encode_logs(event),
+            }},
+            "subscription": subscription,
+        }})
+
+    def client_count(self):
+        return len(self.clients) + len(self.solana_clients)
+
+    async def stream(self, rate, duration):
+        loop = asyncio.get_running_loop()
+        total = int(rate * duration)
+        started = loop.time()
+        for i in range(total):
+            delay = started + i / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            event, mint = self.next_frame()
+            if mint:
+                self.sent_at[mint] = time.time()
+            self.frames_sent += 1
+            if self.clients:
+                websockets.broadcast(self.clients, json.dumps(event))
+            for websocket, subscription in list(self.solana_clients.items()):
+                websockets.broadcast([websocket], self.logs_notification(event, subscription))
+
+    # --- Helius ---
+
+    def _rpc_result(self, method, params):
+        if method == "getAssetsByCreator":
+            creator = params.get("creatorAddress", "")
+            has_tokens = _stable_fraction(creator, "tokens") < self.dev_token_ratio
+            items = [{"interface": "FungibleToken", "id": random_pubkey(self.rng)}] if has_tokens else []
+            return {"total": len(items), "limit": params.get("limit", 50), "page": params.get("page", 1), "items": items}
+        if method == "searchAssets":
+            # Jak prawdziwe DAS: nieznane pola są błędem parametrów, a nie są ignorowane
+            unknown = set(params) - SEARCH_ASSETS_FIELDS
+            if unknown:
+                raise ValueError(f"Invalid params: unknown field(s) {', '.join(sorted(unknown))}")
+            creator = params.get("creatorAddress", "")
+            has_tokens = _stable_fraction(creator, "tokens") < self.dev_token_ratio
+            items = [{"interface": "FungibleToken", "id": random_pubkey(self.rng)}] if has_tokens else []
+            if params.get("tokenType") not in (None, "fungible", "all"):
+                items = []
+            items = items[:params.get("limit", 1000)]
+            return {"total": len(items), "limit": params.get("limit", 1000), "page": params.get("page", 1), "items": items}
+        if method == "getSignaturesForAddress":
+            address = params[0]
+            options = params[1] if len(params) > 1 else {}
+            limit = options.get("limit", 1000)
+            history = 1 + int(_stable_fraction(address, "history") * 300)
+            age = 60 + _stable_fraction(address, "age") * 10 * 86400
+            now = int(time.time())
+            start = 0
+            if options.get("before"):
+                start = int(options["before"].rsplit("-", 1)[1]) + 1
+            result = []
+            for i in range(start, min(history, start + limit)):
+                result.append({"signature": f"{address}-{i}", "blockTime": int(now - age * i / max(1, history - 1))})
+            return result
+        raise KeyError(method)
+
+    def _rpc_response(self, request):
+        self.helius_calls[request.get("method")] = self.helius_calls.get(request.get("method"), 0) + 1
+        if self.helius_error_rate and self.rng.random() < self.helius_error_rate:
+            self.helius_errors += 1
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32000, "message": "fake error"}}
+        try:
+            result = self._rpc_result(request.get("method"), request.get("params"))
+        except KeyError:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32602, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    async def helius_handler(self, request):
+        self.helius_requests += 1
+        if self.helius_429_rate and self.rng.random() < self.helius_429_rate:
+            self.helius_429s += 1
+            return web.json_response({"error": "Too Many Requests"}, status=429)
+        body = await request.json()
+        await asyncio.sleep(max(0.0, self.helius_latency + self.rng.uniform(-self.helius_jitter, self.helius_jitter)))
+        if isinstance(body, list):
+            return web.json_response([self._rpc_response(item) for item in body])
+        return web.json_response(self._rpc_response(body))
+
+    # --- Telegram ---
+
+    async def telegram_handler(self, request):
+        form = await request.post()
+        if self.telegram_429_rate and self.rng.random() < self.telegram_429_rate:
+            self.telegram_429s += 1
+            return web.json_response({
+                "ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }, status=429)
+        await asyncio.sleep(self.telegram_latency)
+        text = form.get("text", "")
+        now = time.time()
+        for mint in MINT_RE.findall(text):
+            self.delivered_at.setdefault(mint, now)
+        self.telegram_messages += 1
+        chat_id = form.get("chat_id", "0")
+        return web.json_response({"ok": True, "result": {
+            "message_id": next(self.message_ids),
+            "date": int(now),
+            "chat": {"id": int(chat_id) if chat_id.lstrip("-").isdigit() else 0, "type": "group"},
+            "text": text,
+        }})
+
+    # --- sterowanie ---
+
+    async def stream_handler(self, request):
+        params = await request.json()
+        if self._stream_task and not self._stream_task.done():
+            return web.json_response({"error": "stream already running"}, status=409)
+        self._stream_task = asyncio.create_task(self.stream(float(params["rate"]), float(params["duration"])))
+        return web.json_response({"ok": True})
+
+    async def stats_handler(self, request):
+        return web.json_response({
+            "clients": self.client_count(),
+            "streaming": bool(self._stream_task and not self._stream_task.done()),
+            "frames_sent": self.frames_sent,
+            "sent_at": self.sent_at,
+            "delivered_at": self.delivered_at,
+            "helius_requests": self.helius_requests,
+            "helius_calls": self.helius_calls,
+            "helius_429s": self.helius_429s,
+            "helius_errors": self.helius_errors,
+            "telegram_messages": self.telegram_messages,
+            "telegram_429s": self.telegram_429s,
+        })
+
+    async def reset_handler(self, request):
+        self.reset()
+        return web.json_response({"ok": True})
+
+    def create_app(self):
+        app = web.Application(client_max_size=16 * 1024 ** 2)
+        app.router.add_post("/helius", self.helius_handler)
+        app.router.add_post("/bot{token}/sendMessage", self.telegram_handler)
+        app.router.add_post("/_bench/stream", self.stream_handler)
+        app.router.add_get("/_bench/stats", self.stats_handler)
+        app.router.add_post("/_bench/reset", self.reset_handler)
+        return app
+
+
+async def serve(services, host, http_port, ws_port):
+    runner = web.AppRunner(services.create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, http_port).start()
+    async with websockets.serve(services.ws_handler, host, ws_port, max_queue=None):
+        log.info("Atrapy usług: http://%s:%d, ws://%s:%d", host, http_port, host, ws_port)
+        await asyncio.Future()
+
+
+def load_replay(path):
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return [event for event in events if event.get("txType") == "create"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Atrapy PumpPortal/Helius/Telegram do benchmarków")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=18080)
+    parser.add_argument("--ws-port", type=int, default=18081)
+    parser.add_argument("--helius-latency-ms", type=float, default=50)
+    parser.add_argument("--helius-jitter-ms", type=float, default=20)
+    parser.add_argument("--helius-error-rate", type=float, default=0.0)
+    parser.add_argument("--helius-429-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-latency-ms", type=float, default=20)
+    parser.add_argument("--telegram-429-rate", type=float, default=0.0)
+    parser.add_argument("--dev-token-ratio", type=float, default=0.5, help="odsetek dev'ów, którzy mają już tokeny")
+    parser.add_argument("--pass-ratio", type=float, default=0.3, help="odsetek zdarzeń przechodzących pre-filtr")
+    parser.add_argument("--dev-pool", type=int, default=5000)
+    parser.add_argument("--non-create-ratio", type=float, default=0.0)
+    parser.add_argument("--replay", help="plik JSONL z nagranymi ramkami PumpPortal")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def services_from_args(args):
+    return FakeServices(
+        helius_latency=args.helius_latency_ms / 1000,
+        helius_jitter=args.helius_jitter_ms / 1000,
+        helius_error_rate=args.helius_error_rate,
+        helius_429_rate=args.helius_429_rate,
+        telegram_latency=args.telegram_latency_ms / 1000,
+        telegram_429_rate=args.telegram_429_rate,
+        dev_token_ratio=args.dev_token_ratio,
+        pass_ratio=args.pass_ratio,
+        dev_pool=args.dev_pool,
+        non_create_ratio=args.non_create_ratio,
+        replay=load_replay(args.replay) if args.replay else None,
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(services_from_args(args), args.host, args.http_port, args.ws_port))
+
+
+if __name__ == "__main__":
+    main()
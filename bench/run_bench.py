@@ -0,0 +1,206 @@
+# Benchmark całego potoku (listen_for_tokens -> handle_token -> Telegram) na lokalnych atrapach usług.
+#
+#   python -m bench.run_bench --rates 10,100,1000,5000 --duration 10 --helius-latency-ms 80
+#
+# Nieznane opcje (np. --helius-429-rate 0.05, --replay stream.jsonl) trafiają do bench.fake_services,
+# które działa w osobnym procesie, żeby nie zabierać CPU mierzonemu botowi.
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+
+import httpx
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark przepustowości i opóźnień bota")
+    parser.add_argument("--rates", default="10,100,1000", help="kolejne tempa zdarzeń create/s, po przecinku")
+    parser.add_argument("--duration", type=float, default=10.0, help="czas nadawania na każde tempo [s]")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--http-port", type=int, default=18080)
+    parser.add_argument("--ws-port", type=int, default=18081)
+    parser.add_argument("--realistic-telegram", action="store_true",
+                        help="zostaw produkcyjne limity Telegrama (domyślnie zdjęte, żeby mierzyć potok)")
+    parser.add_argument("--realistic-helius", action="store_true",
+                        help="zostaw produkcyjny limit zapytań do Heliusa (domyślnie zdjęty)")
+    parser.add_argument("--source", choices=("pumpportal", "solana", "both"), default="pumpportal",
+                        help="źródło zdarzeń bota (INGEST_SOURCE); atrapa obsługuje oba protokoły")
+    parser.add_argument("--json-out", help="zapisz wyniki do pliku JSON")
+    return parser.parse_known_args(argv)
+
+
+def configure_env(args):
+    os.environ.update({
+        "WS_ENDPOINTS": f"ws://127.0.0.1:{args.ws_port}",
+        "SOLANA_WS_URL": f"ws://127.0.0.1:{args.ws_port}",
+        "INGEST_SOURCE": args.source,
+        "HELIUS_RPC_URL": f"http://127.0.0.1:{args.http_port}/helius",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{args.http_port}/bot",
+        "TELEGRAM_TOKEN": "123456:bench",
+        "CHAT_ID": "-1000000000001",
+        "STATE_DB_PATH": "",
+    })
+    os.environ.setdefault("METRICS_PORT", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("STATS_INTERVAL_SECONDS", "3600")
+    if not args.realistic_telegram:
+        os.environ.setdefault("TELEGRAM_CHAT_RATE", "100000")
+        os.environ.setdefault("TELEGRAM_GLOBAL_RATE", "100000")
+    if not args.realistic_helius:
+        os.environ.setdefault("HELIUS_MAX_RPS", "100000")
+
+
+async def wait_for(predicate, timeout, interval=0.1):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await predicate():
+            return True
+        await asyncio.sleep(interval)
+    return False
+
+
+async def run_step(client, bot, rate, duration, drain_timeout):
+    metrics = bot.metrics
+    await client.post("/_bench/reset")
+    events_before = metrics.EVENTS_RECEIVED.value()
+    dropped_before = metrics.EVENTS_FILTERED.value("queue_overflow")
+    rss_before = rss_mb()
+
+    started = time.monotonic()
+    await client.post("/_bench/stream", json={"rate": rate, "duration": duration})
+
+    async def stream_done():
+        return not (await client.get("/_bench/stats")).json()["streaming"]
+
+    await wait_for(stream_done, duration + drain_timeout)
+    stream_elapsed = time.monotonic() - started
+
+    last = {"delivered": -1, "since": time.monotonic()}
+
+    async def drained():
+        depth = metrics.QUEUE_DEPTH.fn() if metrics.QUEUE_DEPTH.fn else {}
+        delivered = len((await client.get("/_bench/stats")).json()["delivered_at"])
+        if delivered != last["delivered"]:
+            last.update(delivered=delivered, since=time.monotonic())
+        return not any(depth.values()) and time.monotonic() - last["since"] > 1.0
+
+    await wait_for(drained, drain_timeout, interval=0.25)
+    elapsed = time.monotonic() - started
+
+    stats = (await client.get("/_bench/stats")).json()
+    sent_at = stats["sent_at"]
+    latencies = sorted(
+        (delivered - sent_at[mint]) * 1000 for mint, delivered in stats["delivered_at"].items() if mint in sent_at
+    )
+    alerts = len(latencies)
+    events = metrics.EVENTS_RECEIVED.value() - events_before
+    rpc_calls = sum(stats["helius_calls"].values())
+    return {
+        "rate": rate,
+        "events_sent": stats["frames_sent"],
+        "events_received": events,
+        "throughput_eps": events / stream_elapsed if stream_elapsed else 0.0,
+        "dropped": metrics.EVENTS_FILTERED.value("queue_overflow") - dropped_before,
+        "alerts": alerts,
+        "telegram_messages": stats["telegram_messages"],
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p99_ms": percentile(latencies, 99),
+        "latency_max_ms": latencies[-1] if latencies else None,
+        "rpc_calls": rpc_calls,
+        "rpc_http_requests": stats["helius_requests"],
+        "rpc_calls_per_alert": rpc_calls / alerts if alerts else None,
+        "rpc_429s": stats["helius_429s"],
+        "rss_before_mb": rss_before,
+        "rss_after_mb": rss_mb(),
+        "rss_growth_mb": rss_mb() - rss_before,
+        "elapsed_s": elapsed,
+    }
+
+
+def print_result(r):
+    def fmt(value, spec=".1f"):
+        return "-" if value is None else format(value, spec)
+
+    print(
+        f"{r['rate']:>7.0f}/s | odebrane {r['events_received']:>7} ({fmt(r['throughput_eps'])}/s) "
+        f"| odrzucone {r['dropped']:>5} | alerty {r['alerts']:>5} "
+        f"| p50 {fmt(r['latency_p50_ms'])} ms p99 {fmt(r['latency_p99_ms'])} ms "
+        f"| RPC/alert {fmt(r['rpc_calls_per_alert'], '.2f')} (HTTP {r['rpc_http_requests']}) "
+        f"| RSS +{fmt(r['rss_growth_mb'])} MB",
+        flush=True,
+    )
+
+
+async def run(args, service_argv):
+    configure_env(args)
+    services = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "bench.fake_services",
+        "--http-port", str(args.http_port), "--ws-port", str(args.ws_port), *service_argv,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.http_port}", timeout=30) as client:
+            async def services_up():
+                try:
+                    await client.get("/_bench/stats")
+                    return True
+                except httpx.HTTPError:
+                    return False
+
+            if not await wait_for(services_up, 15):
+                raise RuntimeError("Atrapy usług nie wystartowały")
+
+            import main as bot
+            bot.setup_logging(bot.LOG_LEVEL, bot.LOG_FORMAT)
+            bot_task = asyncio.create_task(bot.run())
+
+            async def connected():
+                return (await client.get("/_bench/stats")).json()["clients"] > 0
+
+            if not await wait_for(connected, 15):
+                raise RuntimeError("Bot nie połączył się z atrapą PumpPortal")
+
+            results = []
+            for rate in [float(r) for r in args.rates.split(",") if r.strip()]:
+                result = await run_step(client, bot, rate, args.duration, args.drain_timeout)
+                print_result(result)
+                results.append(result)
+
+            bot_task.cancel()
+            await asyncio.gather(bot_task, return_exceptions=True)
+    finally:
+        services.terminate()
+        await services.wait()
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def main(argv=None):
+    args, service_argv = parse_args(argv)
+    asyncio.run(run(args, service_argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import json
+import logging
+import signal
+import time
+
+log = logging.getLogger(__name__)
+
+
+def _positive_int(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError("oczekiwano liczby całkowitej > 0")
+    return value
+
+
+def _non_negative_int(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError("oczekiwano liczby całkowitej >= 0")
+    return value
+
+
+def _positive_number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError("oczekiwano liczby > 0")
+    return float(value)
+
+
+def _non_negative_number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError("oczekiwano liczby >= 0")
+    return float(value)
+
+
+def _optional_string(value):
+    if value is not None and not isinstance(value, (str, int)):
+        raise ValueError("oczekiwano napisu")
+    return None if value is None else str(value)
+
+
+def _profile_list(value):
+    if not isinstance(value, list) or not all(isinstance(entry, dict) and entry.get("name") for entry in value):
+        raise ValueError("oczekiwano listy profili z polem name")
+    return value
+
+
+# Ustawienia zmieniane bez restartu; nazwy jak zmienne środowiskowe, małymi literami
+RELOADABLE = {
+    "chat_id": _optional_string,
+    "profiles": _profile_list,
+    "max_cas": _positive_int,
+    "check_interval_seconds": _positive_number,
+    "dev_cache_max_entries": _positive_int,
+    "creator_page_limit": _positive_int,
+    "signatures_page_limit": _positive_int,
+    "signatures_max_pages": _positive_int,
+    "helius_max_rps": _positive_number,
+    "helius_min_rps": _positive_number,
+    "helius_rps_increase": _positive_number,
+    "helius_credit_budget": _non_negative_number,
+    "telegram_global_rate": _positive_number,
+    "telegram_chat_rate": _positive_number,
+    "telegram_merge_threshold": _non_negative_int,
+    "prewarm_rps": _positive_number,
+    "prewarm_min_sol": _non_negative_number,
+}
+
+
+def parse_config(raw):
+    if not isinstance(raw, dict):
+        raise ValueError("Konfiguracja musi być obiektem JSON")
+    unknown = sorted(set(raw) - set(RELOADABLE))
+    if unknown:
+        raise ValueError(f"Nieznane ustawienia: {', '.join(unknown)}")
+    settings = {}
+    for key, value in raw.items():
+        try:
+            settings[key] = RELOADABLE[key](value)
+        except ValueError as e:
+            raise ValueError(f"{key}: {e}") from None
+    return settings
+
+
+def load_config(path):
+    with open(path) as f:
+        return parse_config(json.load(f))
+
+
+class ConfigReloader:
+    # Plik JSON nakładany na wartości startowe (env). apply() dostaje komplet ustawień
+    # i albo podmienia wszystko, albo rzuca wyjątek – wtedy zostaje poprzednia konfiguracja.
+    def __init__(self, path, base, apply):
+        self.path = path
+        self.base = dict(base)
+        self.apply = apply
+        self.current = dict(base)
+        self.reloads = 0
+        self.failures = 0
+        self.loaded_at = None
+
+    def reload(self):
+        started = time.perf_counter()
+        try:
+            overrides = load_config(self.path) if self.path else {}
+            settings = dict(self.base, **overrides)
+            self.apply(settings, overrides)
+        except (OSError, ValueError, TypeError) as e:
+            self.failures += 1
+            log.error("Nie udało się przeładować konfiguracji %s: %s", self.path, e)
+            raise
+        self.current = settings
+        self.reloads += 1
+        self.loaded_at = time.time()
+        log.info(
+            "Przeładowano konfigurację w %.1f ms: %s", (time.perf_counter() - started) * 1000,
+            ", ".join(sorted(overrides)) or "wartości startowe", extra={"config": overrides},
+        )
+        return settings
+
+    def install_signal_handler(self, loop, signum=signal.SIGHUP, on_signal=None):
+        def handler():
+            if on_signal is not None:
+                on_signal(signum)
+            try:
+                self.reload()
+            except (OSError, ValueError, TypeError):
+                pass
+
+        loop.add_signal_handler(signum, handler)
+
+    def stats(self):
+        return {"reloads": self.reloads, "failures": self.failures, "loaded_at": self.loaded_at}
@@ -0,0 +1,55 @@
+import logging
+
+from helius import HeliusError
+
+log = logging.getLogger(__name__)
+
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+# RPC bez searchAssets albo z inną wersją jego parametrów – przechodzimy na getAssetsByCreator
+FALLBACK_CODES = (METHOD_NOT_FOUND, INVALID_PARAMS)
+
+
+class CreatorAssetCounter:
+    # Liczy tokeny FungibleToken dev'a tylko do `need` – tyle wystarcza do decyzji profilu.
+    # Tryb lean: searchAssets z tokenType=fungible i stroną wielkości `need`;
+    # w przeciwnym razie małe strony getAssetsByCreator, kolejna tylko gdy poprzednia nie rozstrzyga.
+    def __init__(self, helius, lean=True, page_limit=10, max_pages=5):
+        self.helius = helius
+        self.lean = lean
+        self.page_limit = page_limit
+        self.max_pages = max_pages
+        self.pages_fetched = 0
+
+    async def count(self, creator_address, need):
+        if self.lean:
+            try:
+                # searchAssets ma własne pola: onlyVerified nie istnieje, twórca niezweryfikowany to domyślne zachowanie
+                return await self._count_pages(
+                    creator_address, need, "searchAssets", need, {"creatorAddress": creator_address, "tokenType": "fungible"},
+                )
+            except HeliusError as e:
+                if e.code not in FALLBACK_CODES:
+                    raise
+                log.warning("RPC odrzuca searchAssets (%s), przechodzę na getAssetsByCreator", e)
+                self.lean = False
+        return await self._count_pages(
+            creator_address, need, "getAssetsByCreator", self.page_limit,
+            {"creatorAddress": creator_address, "onlyVerified": False},
+        )
+
+    async def _count_pages(self, creator_address, need, method, limit, params):
+        count = 0
+        for page in range(1, self.max_pages + 1):
+            result = await self.helius.call(method, dict(params, page=page, limit=limit))
+            self.pages_fetched += 1
+            items = (result or {}).get("items", [])
+            for asset in items:
+                if asset.get("interface") == "FungibleToken":
+                    count += 1
+                    log.debug("Znaleziono token #%d dla dev'a %s", count, creator_address)
+                    if count >= need:
+                        return count
+            if len(items) < limit:
+                break
+        return count
@@ -0,0 +1,90 @@
+import json
+from typing import Optional, Union
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Tylko te pola są potrzebne w handle_token
+CREATE_FIELDS = ("txType", "mint", "name", "symbol", "traderPublicKey", "initialBuy", "solAmount")
+
+
+def is_create_frame(message):
+    # Tani test na surowej ramce – ramki bez "create" nie są w ogóle dekodowane
+    if isinstance(message, str):
+        return '"create"' in message
+    return b'"create"' in message
+
+
+def _pick_create(data):
+    if not isinstance(data, dict) or data.get("txType") != "create":
+        return None
+    return {field: data[field] for field in CREATE_FIELDS if field in data}
+
+
+class StdlibDecoder:
+    name = "json"
+
+    def decode_create(self, message):
+        return _pick_create(json.loads(message))
+
+
+class OrjsonDecoder:
+    name = "orjson"
+
+    def decode_create(self, message):
+        return _pick_create(orjson.loads(message))
+
+
+if msgspec is not None:
+    class CreateEvent(msgspec.Struct):
+        txType: Optional[str] = None
+        mint: Optional[str] = None
+        name: Optional[str] = None
+        symbol: Optional[str] = None
+        traderPublicKey: Optional[str] = None
+        initialBuy: Union[float, None] = None
+        solAmount: Union[float, None] = None
+
+    class MsgspecDecoder:
+        name = "msgspec"
+
+        def __init__(self):
+            self._decoder = msgspec.json.Decoder(CreateEvent)
+            self._fallback = OrjsonDecoder() if orjson is not None else StdlibDecoder()
+
+        def decode_create(self, message):
+            try:
+                event = self._decoder.decode(message)
+            except msgspec.ValidationError:
+                # Nietypowe typy pól – dekodujemy całość wolniejszą ścieżką
+                return self._fallback.decode_create(message)
+            if event.txType != "create":
+                return None
+            return {field: value for field in CREATE_FIELDS if (value := getattr(event, field)) is not None}
+
+
+def get_decoder(name="auto"):
+    if name == "auto":
+        if msgspec is not None:
+            return MsgspecDecoder()
+        if orjson is not None:
+            return OrjsonDecoder()
+        return StdlibDecoder()
+    if name == "msgspec":
+        if msgspec is None:
+            raise ValueError("msgspec nie jest zainstalowany")
+        return MsgspecDecoder()
+    if name == "orjson":
+        if orjson is None:
+            raise ValueError("orjson nie jest zainstalowany")
+        return OrjsonDecoder()
+    if name == "json":
+        return StdlibDecoder()
+    raise ValueError(f"Nieznany dekoder JSON: {name}")
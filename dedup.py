@@ -0,0 +1,249 @@
+import contextlib
+import fcntl
+import hashlib
+import os
+import struct
+import tempfile
+from array import array
+
+KEY_SIZE = 32
+HOME_FORMAT = f"<Q{KEY_SIZE - 8}x"
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {c: i for i, c in enumerate(B58_ALPHABET)}
+
+
+def b58decode_pubkey(value):
+    n = 0
+    try:
+        for c in value:
+            n = n * 58 + B58_INDEX[c]
+    except KeyError:
+        return None
+    if n >> (KEY_SIZE * 8):
+        return None
+    return n.to_bytes(KEY_SIZE, "big")
+
+
+def b58encode(raw):
+    n = int.from_bytes(raw, "big")
+    chars = []
+    while n:
+        n, r = divmod(n, 58)
+        chars.append(B58_ALPHABET[r])
+    pad = len(raw) - len(raw.lstrip(b"\0"))
+    return "1" * pad + "".join(reversed(chars))
+
+
+def mint_key(ca):
+    key = b58decode_pubkey(ca)
+    if key is None:
+        # Nie-base58 albo za długi ciąg – i tak potrzebujemy 32 bajtów
+        key = hashlib.blake2b(ca.encode(), digest_size=KEY_SIZE).digest()
+    return key
+
+
+class MintDedup:
+    # Okno ostatnich `capacity` mintów: 32-bajtowe klucze w buforze cyklicznym
+    # plus indeks z adresowaniem otwartym (sondowanie liniowe, ~2 sloty na klucz).
+    # Operacje są synchroniczne, więc w pętli asyncio nie potrzeba locka.
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("capacity musi być > 0")
+        self.capacity = capacity
+        size = 1
+        while size < capacity * 2:
+            size <<= 1
+        self._mask = size - 1
+        self._keys = bytearray(capacity * KEY_SIZE)
+        self._view = memoryview(self._keys)
+        # 0 = pusty slot, w przeciwnym razie pozycja w buforze + 1
+        self._index = array("I", bytes(4 * size))
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, ca):
+        return self._find(mint_key(ca))[1]
+
+    def nbytes(self):
+        return len(self._keys) + len(self._index) * self._index.itemsize
+
+    def add(self, ca):
+        return self._add_key(mint_key(ca))
+
+    def keys(self):
+        # Klucze od najstarszego: [head:] + [:head] przy pełnym buforze, inaczej [:count]
+        if self._count == self.capacity:
+            return bytes(self._view[self._head * KEY_SIZE:]) + bytes(self._view[:self._head * KEY_SIZE])
+        return bytes(self._view[:self._count * KEY_SIZE])
+
+    def load_keys(self, keys):
+        # Podmienia okno na `keys` (wynik keys(), od najstarszego); zostaje `capacity` najnowszych.
+        # Klucze są unikalne, więc indeks budujemy bez porównań – tylko szukanie wolnego slotu
+        keep = min(len(keys) // KEY_SIZE, self.capacity)
+        MintDedup.__init__(self, self.capacity)
+        self._keys[:keep * KEY_SIZE] = keys[len(keys) - keep * KEY_SIZE:]
+        index = self._index
+        mask = self._mask
+        # Pierwsze 8 bajtów klucza (jak w _home) odczytane hurtem przez struct
+        homes = struct.iter_unpack(HOME_FORMAT, self._view[:keep * KEY_SIZE])
+        for position, (home,) in enumerate(homes, 1):
+            slot = home & mask
+            while index[slot]:
+                slot = (slot + 1) & mask
+            index[slot] = position
+        self._count = keep
+        self._head = keep % self.capacity
+
+    def resize(self, capacity):
+        # Nowe okno w tym samym obiekcie; zostaje `capacity` najnowszych mintów, w tej samej kolejności
+        if capacity <= 0:
+            raise ValueError("capacity musi być > 0")
+        keys = self.keys()
+        self.capacity = capacity
+        self.load_keys(keys)
+
+    def _add_key(self, key):
+        slot, found = self._find(key)
+        if found:
+            return False
+        if self._count == self.capacity:
+            self._remove_position(self._head)
+            slot, _ = self._find(key)
+        else:
+            self._count += 1
+        position = self._head
+        offset = position * KEY_SIZE
+        self._view[offset:offset + KEY_SIZE] = key
+        self._index[slot] = position + 1
+        self._head = (position + 1) % self.capacity
+        return True
+
+    def _home(self, key):
+        return int.from_bytes(key[:8], "little") & self._mask
+
+    def _key_at(self, position):
+        offset = position * KEY_SIZE
+        return self._view[offset:offset + KEY_SIZE]
+
+    def _find(self, key):
+        index = self._index
+        mask = self._mask
+        slot = self._home(key)
+        while True:
+            entry = index[slot]
+            if entry == 0:
+                return slot, False
+            if self._key_at(entry - 1) == key:
+                return slot, True
+            slot = (slot + 1) & mask
+
+    def _remove_position(self, position):
+        index = self._index
+        mask = self._mask
+        slot = self._home(self._key_at(position))
+        while index[slot] != position + 1:
+            slot = (slot + 1) & mask
+        # Usuwanie z przesunięciem wstecz, żeby nie zostawiać nagrobków
+        hole = slot
+        while True:
+            slot = (slot + 1) & mask
+            entry = index[slot]
+            if entry == 0:
+                break
+            home = self._home(self._key_at(entry - 1))
+            if (slot - home) & mask >= (slot - hole) & mask:
+                index[hole] = entry
+                hole = slot
+        index[hole] = 0
+
+
+class SharedMintDedup(MintDedup):
+    # To samo okno mintów w segmencie shared_memory, wspólne dla procesów na jednym hoście.
+    # Układ: nagłówek (magic, capacity, head, count) | klucze | indeks. Zapisy pod flock.
+    MAGIC = 0x7467626F74636173
+
+    def __init__(self, name, capacity, lock_path=None):
+        from multiprocessing import resource_tracker, shared_memory
+
+        if capacity <= 0:
+            raise ValueError("capacity musi być > 0")
+        self.capacity = capacity
+        size = 1
+        while size < capacity * 2:
+            size <<= 1
+        self._mask = size - 1
+        keys_size = capacity * KEY_SIZE
+        total = 32 + keys_size + 4 * size
+        self._lock_file = open(lock_path or os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a+b")
+        with self._locked():
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+                created = True
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+                created = False
+            # Segment ma przeżyć proces, który go utworzył; sprząta go unlink()
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+            buf = self._shm.buf
+            self._header = buf[:32].cast("Q")
+            if created:
+                self._header[0] = self.MAGIC
+                self._header[1] = capacity
+            elif self._header[0] != self.MAGIC or self._header[1] != capacity or len(buf) < total:
+                raise ValueError(f"Segment {name} ma inny układ (capacity {self._header[1]})")
+        self._view = buf[32:32 + keys_size]
+        self._keys = self._view
+        self._index = buf[32 + keys_size:total].cast("I")
+
+    @property
+    def _head(self):
+        return self._header[2]
+
+    @_head.setter
+    def _head(self, value):
+        self._header[2] = value
+
+    @property
+    def _count(self):
+        return self._header[3]
+
+    @_count.setter
+    def _count(self, value):
+        self._header[3] = value
+
+    @contextlib.contextmanager
+    def _locked(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def __contains__(self, ca):
+        with self._locked():
+            return super().__contains__(ca)
+
+    def add(self, ca):
+        with self._locked():
+            return super().add(ca)
+
+    def load_keys(self, keys):
+        raise ValueError("Okna w shared_memory nie da się podmienić w locie – potrzebny nowy segment")
+
+    def resize(self, capacity):
+        raise ValueError("Okna w shared_memory nie da się zmienić w locie – potrzebny nowy segment")
+
+    def close(self):
+        for view in (self._index, self._view, self._header):
+            view.release()
+        self._shm.close()
+        self._lock_file.close()
+
+    def unlink(self):
+        from multiprocessing import shared_memory
+
+        shared_memory.SharedMemory(name=self._shm.name).unlink()
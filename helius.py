@@ -0,0 +1,293 @@
+import asyncio
+import random
+import time
+
+import httpx
+
+import metrics
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HeliusError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        # Kod błędu JSON-RPC, jeśli serwer go podał
+        self.code = code
+
+
+class HeliusTransientError(HeliusError):
+    # Timeout, błąd połączenia albo 5xx – warto ponowić, liczy się do bezpiecznika
+    pass
+
+
+class HeliusRateLimited(HeliusTransientError):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class HeliusUnavailable(HeliusError):
+    # Otwarty bezpiecznik albo wyczerpany budżet kredytów – bez zapytania do Heliusa
+    pass
+
+
+class HeliusClient:
+    def __init__(self, url, timeout=10.0, max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0,
+                 batch_window=0.0, batch_max_size=50, limiter=None, budget=None, breaker=None,
+                 retries=2, backoff_initial=0.5, backoff_max=10.0):
+        self.url = url
+        self.timeout = timeout
+        # batch_window w sekundach; 0 wyłącza łączenie wywołań w paczki
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+        # Wspólne dla wszystkich tokenów: limiter tempa (AIMD), budżet kredytów i bezpiecznik
+        self.limiter = limiter
+        self.budget = budget
+        self.breaker = breaker
+        self.retries = retries
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.calls_made = 0
+        self.retries_made = 0
+        self.rejected = 0
+        self.requests_sent = 0
+        self._pending = []
+        self._flush_handle = None
+        self._batch_tasks = set()
+        self._next_id = 0
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=self.limits,
+                timeout=self.timeout,
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for _, _, _, future in self._pending:
+            if not future.done():
+                future.cancel()
+        self._pending = []
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        self._get_client()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def post(self, payload, timeout=None):
+        client = self._get_client()
+        self.requests_sent += 1
+        metrics.RPC_HTTP_REQUESTS.inc()
+        # Bezpiecznik liczy nieudane zapytania HTTP, nie wywołania – paczka po timeoucie to jeden błąd
+        try:
+            response = await client.post(self.url, json=payload, timeout=timeout or self.timeout)
+        except httpx.TransportError as e:
+            self._record_failure()
+            raise HeliusTransientError(f"{type(e).__name__}: {e}") from e
+        if response.status_code == 429:
+            raise HeliusRateLimited("HTTP 429", retry_after=_retry_after(response))
+        if response.status_code >= 500:
+            self._record_failure()
+            raise HeliusTransientError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response.json()
+
+    def _record_failure(self):
+        if self.breaker:
+            self.breaker.record_failure()
+
+    async def call(self, method, params, timeout=None):
+        self.calls_made += 1
+        metrics.RPC_CALLS.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            return await self._call_with_retry(method, params, timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            metrics.RPC_ERRORS.labels(method).inc()
+            raise
+        finally:
+            metrics.RPC_LATENCY.labels(method).observe(time.perf_counter() - started)
+
+    def stats(self):
+        return {
+            "calls": self.calls_made,
+            "requests": self.requests_sent,
+            "retries": self.retries_made,
+            "rejected": self.rejected,
+            "rate": self.limiter.rate if self.limiter else None,
+            "throttles": self.limiter.throttles if self.limiter else 0,
+            "credits_left": self.budget.remaining if self.budget else None,
+            "breaker": self.breaker.state if self.breaker else None,
+        }
+
+    async def _admit(self, method):
+        # Budżet przed bezpiecznikiem: odrzucenie przez budżet nie może zająć próby w stanie półotwartym.
+        # Zwraca próbę (CircuitBreaker.probe) do zwolnienia, gdy zapytanie skończy się bez werdyktu.
+        if self.budget and not self.budget.can_spend(method):
+            self.rejected += 1
+            metrics.RPC_REJECTED.labels("budget").inc()
+            raise HeliusUnavailable(f"{method}: wyczerpany budżet kredytów")
+        if self.breaker and not self.breaker.allow():
+            self.rejected += 1
+            metrics.RPC_REJECTED.labels("circuit_open").inc()
+            raise HeliusUnavailable(f"{method}: bezpiecznik otwarty")
+        if self.budget:
+            self.budget.try_spend(method)
+        probe = self.breaker.probe() if self.breaker else None
+        if self.limiter:
+            try:
+                await self.limiter.acquire()
+            except BaseException:
+                if probe is not None:
+                    self.breaker.release_probe(probe)
+                raise
+        return probe
+
+    async def _call_with_retry(self, method, params, timeout):
+        attempt = 0
+        while True:
+            probe = await self._admit(method)
+            try:
+                result = await self._call(method, params, timeout)
+            except HeliusRateLimited as e:
+                if self.limiter:
+                    self.limiter.on_throttle(e.retry_after)
+                error, delay = e, e.retry_after
+            except HeliusTransientError as e:
+                # Porażka już policzona w post(), raz na zapytanie HTTP
+                error, delay = e, None
+            except HeliusError:
+                # Odpowiedź JSON-RPC z błędem – serwer działa, ponawianie nic nie da
+                if self.breaker:
+                    self.breaker.record_success()
+                raise
+            else:
+                if self.breaker:
+                    self.breaker.record_success()
+                if self.limiter:
+                    self.limiter.on_success()
+                return result
+            finally:
+                # Po record_success/record_failure to nic nie zmienia; po anulowaniu, 429
+                # albo błędzie spoza Heliusa (np. 4xx, zły JSON) zwalnia próbę
+                if probe is not None:
+                    self.breaker.release_probe(probe)
+
+            if attempt >= self.retries:
+                raise error
+            attempt += 1
+            self.retries_made += 1
+            metrics.RPC_RETRIES.labels(method).inc()
+            if delay is None:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_initial * 2 ** attempt))
+            await asyncio.sleep(delay)
+
+    async def _call(self, method, params, timeout):
+        if self.batch_window <= 0:
+            payload = {
+                "jsonrpc": "2.0",
+                "id": "helius",
+                "method": method,
+                "params": params,
+            }
+            data = await self.post(payload, timeout=timeout)
+            return _unwrap(method, data)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((method, params, timeout, future))
+        if len(self._pending) >= self.batch_max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        entries = [entry for entry in self._pending if not entry[3].done()]
+        self._pending = []
+        if not entries:
+            return
+        task = asyncio.create_task(self._send_batch(entries))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, entries):
+        payload = []
+        by_id = {}
+        timeout = None
+        for method, params, call_timeout, future in entries:
+            self._next_id += 1
+            request_id = str(self._next_id)
+            by_id[request_id] = (method, future)
+            payload.append({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+            if call_timeout and (timeout is None or call_timeout > timeout):
+                timeout = call_timeout
+
+        try:
+            if len(payload) == 1:
+                data = [await self.post(payload[0], timeout=timeout)]
+                data[0]["id"] = payload[0]["id"]
+            else:
+                data = await self.post(payload, timeout=timeout)
+            if not isinstance(data, list):
+                raise HeliusError(f"Nieoczekiwana odpowiedź na paczkę: {data}")
+        except Exception as e:
+            for _, future in by_id.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for item in data:
+            method, future = by_id.pop(str(item.get("id")), (None, None))
+            if future is None or future.done():
+                continue
+            try:
+                future.set_result(_unwrap(method, item))
+            except HeliusError as e:
+                future.set_exception(e)
+        for method, future in by_id.values():
+            if not future.done():
+                future.set_exception(HeliusError(f"{method}: brak odpowiedzi w paczce"))
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def _unwrap(method, data):
+    error = data.get("error")
+    if error:
+        raise HeliusError(f"{method}: {error}", code=error.get("code") if isinstance(error, dict) else None)
+    return data.get("result")
@@ -1,97 +1,303 @@
 import asyncio
-import websockets
-import json
+import concurrent.futures
+import logging
+import tempfile
 import datetime
-import pytz
-import requests
+import functools
 from telegram import Bot
 import os
-from collections import deque
+import signal
+import time
+from pipeline import StageStats, TokenPipeline
+from helius import HeliusClient
+from rate_limit import AdaptiveRateLimiter, CircuitBreaker, CreditBudget
+from dev_cache import DevCache
+from signatures import SignatureWalker
+from creator_assets import CreatorAssetCounter
+from state_store import StateStore
+from dedup import MintDedup
+from shared_state import SharedState, create_backend
+from singleflight import SingleFlight
+from sharding import ShardRouter, ShardServer, spawn_local_workers
+from ws_manager import ConnectionManager
+from telegram_dispatch import TelegramDispatcher
+from profiles import build_profiles, load_profiles, initial_buy_percentage as compute_initial_buy_percentage
+from config import ConfigReloader
+from prefilter import PrefilterBatcher
+from prewarm import DevPrewarmer
+from profiling import LoopMonitor, ProfileDumper, executor_stats
+from templates import get_template
+from decoder import get_decoder, is_create_frame
+from solana_ingest import decode_logs_notification, is_create_notification, logs_subscribe_request, ws_url_from_rpc
+from logs import LazyJson, setup_logging, shutdown_logging
+import metrics
+
+log = logging.getLogger("tgbot")
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json albo text
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
 HELIUS_RPC_URL = os.getenv("HELIUS_RPC_URL")
 
-bot = Bot(token=TELEGRAM_TOKEN)
+# Profile filtrowania: plik JSON (lista profili) albo wbudowane profile po przecinku
+PROFILES_FILE = os.getenv("PROFILES_FILE", "")
+PROFILES = [name.strip() for name in os.getenv("PROFILES", "main").split(",") if name.strip()]
+profiles = load_profiles(PROFILES_FILE or None, PROFILES, default_chat_id=CHAT_ID)
+for _profile in profiles:
+    get_template(_profile.parse_mode, _profile.timezone)  # kompilacja szablonu i walidacja formatu przy starcie
+# Skalowanie: off (jeden proces), ingest (WebSocket -> workery), worker (obsługa tokenów)
+SHARD_MODE = os.getenv("SHARD_MODE", "off")
+SHARD_WORKERS = [a.strip() for a in os.getenv("SHARD_WORKERS", "").split(",") if a.strip()]  # host:port,...
+SHARD_SPAWN = int(os.getenv("SHARD_SPAWN", "0"))  # workery uruchamiane lokalnie przez ingest
+SHARD_HOST = os.getenv("SHARD_HOST", "127.0.0.1")
+SHARD_BASE_PORT = int(os.getenv("SHARD_BASE_PORT", "9200"))
+SHARD_LISTEN = os.getenv("SHARD_LISTEN", f"{SHARD_HOST}:{SHARD_BASE_PORT}")
+# Limity Telegrama i Heliusa są wspólne dla całego bota, więc każdy worker dostaje 1/N
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1")) if SHARD_MODE == "worker" else 1
+# local, shm (shared_memory na jednym hoście) albo redis (STATE_BACKEND_URL)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "local")
+STATE_BACKEND_URL = os.getenv("STATE_BACKEND_URL", "")
+STATE_BACKEND_NAME = os.getenv("STATE_BACKEND_NAME", "tgbot")
+HELIUS_TIMEOUT_SECONDS = float(os.getenv("HELIUS_TIMEOUT_SECONDS", "10"))
+HELIUS_BATCH_WINDOW_MS = float(os.getenv("HELIUS_BATCH_WINDOW_MS", "20"))  # 0 wyłącza paczki
+HELIUS_BATCH_MAX_SIZE = int(os.getenv("HELIUS_BATCH_MAX_SIZE", "50"))
+# Limit wywołań/s; po 429 spada o połowę i wraca o HELIUS_RPS_INCREASE co sekundę
+HELIUS_MAX_RPS = float(os.getenv("HELIUS_MAX_RPS", "50")) / SHARD_COUNT
+HELIUS_MIN_RPS = float(os.getenv("HELIUS_MIN_RPS", "1"))
+HELIUS_RPS_INCREASE = float(os.getenv("HELIUS_RPS_INCREASE", "1"))
+# Budżet kredytów na okres; 0 = bez limitu. Metody DAS i historyczne kosztują więcej
+HELIUS_CREDIT_BUDGET = int(os.getenv("HELIUS_CREDIT_BUDGET", "0")) // SHARD_COUNT
+HELIUS_CREDIT_PERIOD_SECONDS = float(os.getenv("HELIUS_CREDIT_PERIOD_SECONDS", "86400"))
+HELIUS_METHOD_CREDITS = {"getAssetsByCreator": 10, "searchAssets": 10, "getSignaturesForAddress": 10}
+HELIUS_RETRIES = int(os.getenv("HELIUS_RETRIES", "2"))
+HELIUS_BREAKER_THRESHOLD = int(os.getenv("HELIUS_BREAKER_THRESHOLD", "5"))
+HELIUS_BREAKER_COOLDOWN_SECONDS = float(os.getenv("HELIUS_BREAKER_COOLDOWN_SECONDS", "30"))
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")) / SHARD_COUNT  # wiadomości/s
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", str(20 / 60))) / SHARD_COUNT  # wiadomości/s na czat
+TELEGRAM_MERGE_THRESHOLD = int(os.getenv("TELEGRAM_MERGE_THRESHOLD", "5"))  # 0 = bez łączenia
+
+bot = Bot(token=TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL)
+dispatcher = TelegramDispatcher(
+    bot,
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE,
+    merge_threshold=TELEGRAM_MERGE_THRESHOLD,
+)
+helius = HeliusClient(
+    HELIUS_RPC_URL,
+    timeout=HELIUS_TIMEOUT_SECONDS,
+    batch_window=HELIUS_BATCH_WINDOW_MS / 1000,
+    batch_max_size=HELIUS_BATCH_MAX_SIZE,
+    limiter=AdaptiveRateLimiter(HELIUS_MAX_RPS, min_rate=HELIUS_MIN_RPS, increase=HELIUS_RPS_INCREASE),
+    budget=CreditBudget(
+        HELIUS_CREDIT_BUDGET, HELIUS_CREDIT_PERIOD_SECONDS, method_costs=HELIUS_METHOD_CREDITS,
+    ) if HELIUS_CREDIT_BUDGET else None,
+    breaker=CircuitBreaker(HELIUS_BREAKER_THRESHOLD, HELIUS_BREAKER_COOLDOWN_SECONDS),
+    retries=HELIUS_RETRIES,
+)
+
+MAX_CAS = int(os.getenv("MAX_CAS", "1000000"))
+seen_cas = MintDedup(MAX_CAS)
 
-MAX_CAS = 1000
-last_seen_cas_set = set()
-last_seen_cas_queue = deque(maxlen=MAX_CAS)
-last_seen_cas_lock = asyncio.Lock()
-
-dev_last_checked = {}
-dev_cache_lock = asyncio.Lock()
 CHECK_INTERVAL_SECONDS = 15 * 60  # 15 minut
+DEV_CACHE_MAX_ENTRIES = int(os.getenv("DEV_CACHE_MAX_ENTRIES", "100000"))
+dev_cache = DevCache(max_entries=DEV_CACHE_MAX_ENTRIES, ttl=CHECK_INTERVAL_SECONDS)
+state = SharedState(seen_cas, dev_cache)
+# lean: searchAssets tylko z tokenami fungible, strona wielkości progu; full: strony getAssetsByCreator
+CREATOR_CHECK_MODE = os.getenv("CREATOR_CHECK_MODE", "lean")
+CREATOR_PAGE_LIMIT = int(os.getenv("CREATOR_PAGE_LIMIT", "10"))
+creator_assets = CreatorAssetCounter(helius, lean=CREATOR_CHECK_MODE == "lean", page_limit=CREATOR_PAGE_LIMIT)
+# Najstarsza transakcja dev'a: strony po SIGNATURES_PAGE_LIMIT, punkt kontrolny na dev'a
+SIGNATURES_PAGE_LIMIT = int(os.getenv("SIGNATURES_PAGE_LIMIT", "1000"))
+SIGNATURES_MAX_PAGES = int(os.getenv("SIGNATURES_MAX_PAGES", "5"))
+SIGNATURES_CHECKPOINT_TTL_SECONDS = float(os.getenv("SIGNATURES_CHECKPOINT_TTL_SECONDS", str(7 * 86400)))
+signature_walker = SignatureWalker(
+    helius,
+    DevCache(max_entries=DEV_CACHE_MAX_ENTRIES, ttl=SIGNATURES_CHECKPOINT_TTL_SECONDS),
+    page_limit=SIGNATURES_PAGE_LIMIT,
+    max_pages=SIGNATURES_MAX_PAGES,
+)
+
+# Plik SQLite ze stanem (widziane CA i cache dev'ów); pusty = bez zapisu na dysk
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "")
+# Co ile zapisywać całe okno mintów jednym BLOB-em (szybki start zamiast 1M wierszy)
+STATE_SNAPSHOT_SECONDS = float(os.getenv("STATE_SNAPSHOT_SECONDS", "300"))
+state_store = None
+
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "8"))
+QUEUE_MAXSIZE = int(os.getenv("QUEUE_MAXSIZE", "1000"))
+QUEUE_POLICY = os.getenv("QUEUE_POLICY", "drop_oldest")  # drop_oldest albo block
+STATS_INTERVAL_SECONDS = int(os.getenv("STATS_INTERVAL_SECONDS", "60"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 wyłącza /metrics
+# Równoległe zapytania o liczbę tokenów i najstarszą transakcję dev'a
+SPECULATIVE_LOOKUPS = os.getenv("SPECULATIVE_LOOKUPS", "0") == "1"
+# auto (msgspec > orjson > json), msgspec, orjson albo json
+JSON_DECODER = os.getenv("JSON_DECODER", "auto")
+decoder = get_decoder(JSON_DECODER)
+# Okno zbierania zdarzeń do wektorowego pre-filtra; 0 = filtrowanie pojedynczo w handle_token
+PREFILTER_WINDOW_MS = float(os.getenv("PREFILTER_WINDOW_MS", "5"))
+PREFILTER_MAX_BATCH = int(os.getenv("PREFILTER_MAX_BATCH", "512"))
+prefilter = None
+
+# Kilka endpointów po przecinku; przy WS_CONNECTIONS=2 oba gniazda są scalane przez deduplikację
+WS_ENDPOINTS = [uri.strip() for uri in os.getenv("WS_ENDPOINTS", "wss://pumpportal.fun/api/data").split(",") if uri.strip()]
+WS_CONNECTIONS = int(os.getenv("WS_CONNECTIONS", "1"))
+WS_BACKOFF_INITIAL_SECONDS = float(os.getenv("WS_BACKOFF_INITIAL_SECONDS", "0.5"))
+WS_BACKOFF_MAX_SECONDS = float(os.getenv("WS_BACKOFF_MAX_SECONDS", "30"))
+WS_PING_INTERVAL_SECONDS = float(os.getenv("WS_PING_INTERVAL_SECONDS", "20"))
+WS_STALL_TIMEOUT_SECONDS = float(os.getenv("WS_STALL_TIMEOUT_SECONDS", "60"))
+# Źródło zdarzeń create: pumpportal, solana (logsSubscribe na programie pump.fun) albo both
+INGEST_SOURCE = os.getenv("INGEST_SOURCE", "pumpportal")
+SOLANA_WS_URL = os.getenv("SOLANA_WS_URL", "") or (ws_url_from_rpc(HELIUS_RPC_URL) if HELIUS_RPC_URL else "")
+SOLANA_COMMITMENT = os.getenv("SOLANA_COMMITMENT", "processed")
+connection_managers = {}
+# Współbieżne zapytania o tego samego dev'a (ta sama metoda) czekają na jedno wywołanie
+in_flight = SingleFlight()
+# Pre-warming: osobne połączenie PumpPortal z transakcjami świeżych tokenów i ich dev'ów;
+# sprzedający (najpierw dev'y) są rozwiązywani w tle do cache, zanim wypuszczą kolejny token
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "0") == "1"
+PREWARM_RPS = float(os.getenv("PREWARM_RPS", "2")) / SHARD_COUNT
+PREWARM_MIN_SOL = float(os.getenv("PREWARM_MIN_SOL", "1"))
+PREWARM_WATCH_SECONDS = float(os.getenv("PREWARM_WATCH_SECONDS", "600"))
+PREWARM_MAX_WATCHED = int(os.getenv("PREWARM_MAX_WATCHED", "500"))
+# Pre-warming czeka, gdy limiter Heliusa ma mniej wolnej pojemności / budżet mniej kredytów niż te progi
+PREWARM_MIN_HEADROOM = float(os.getenv("PREWARM_MIN_HEADROOM", "0.5"))
+PREWARM_CREDIT_RESERVE = float(os.getenv("PREWARM_CREDIT_RESERVE", "0.2"))
+prewarmer = None
+
+# Plik JSON z ustawieniami zmienianymi bez restartu (config.RELOADABLE); przeładowanie: SIGHUP
+# albo POST /admin/reload na serwerze /metrics. Brakujące klucze = wartości z env.
+CONFIG_FILE = os.getenv("CONFIG_FILE", "")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+BASE_SETTINGS = {
+    "chat_id": CHAT_ID,
+    "profiles": None,  # None = PROFILES_FILE albo PROFILES
+    "max_cas": MAX_CAS,
+    "check_interval_seconds": CHECK_INTERVAL_SECONDS,
+    "dev_cache_max_entries": DEV_CACHE_MAX_ENTRIES,
+    "creator_page_limit": CREATOR_PAGE_LIMIT,
+    "signatures_page_limit": SIGNATURES_PAGE_LIMIT,
+    "signatures_max_pages": SIGNATURES_MAX_PAGES,
+    "helius_max_rps": HELIUS_MAX_RPS,
+    "helius_min_rps": HELIUS_MIN_RPS,
+    "helius_rps_increase": HELIUS_RPS_INCREASE,
+    "helius_credit_budget": HELIUS_CREDIT_BUDGET,
+    "telegram_global_rate": TELEGRAM_GLOBAL_RATE,
+    "telegram_chat_rate": TELEGRAM_CHAT_RATE,
+    "telegram_merge_threshold": TELEGRAM_MERGE_THRESHOLD,
+    "prewarm_rps": PREWARM_RPS,
+    "prewarm_min_sol": PREWARM_MIN_SOL,
+}
+# Limity wspólne dla całego bota – wartości z pliku też dzielimy między workery
+PER_SHARD_SETTINGS = ("helius_max_rps", "helius_credit_budget", "telegram_global_rate", "telegram_chat_rate", "prewarm_rps")
+# Instrumentacja: opóźnienie pętli, blokady ze stosem, pula wątków; SIGUSR1 = profil cProfile
+# przez PROFILING_SECONDS, SIGUSR2 = zrzut stosów tasków i wątków (pliki w PROFILING_DIR)
+PROFILING = os.getenv("PROFILING", "0") == "1"
+PROFILING_LAG_INTERVAL_MS = float(os.getenv("PROFILING_LAG_INTERVAL_MS", "100"))
+PROFILING_SLOW_CALLBACK_MS = float(os.getenv("PROFILING_SLOW_CALLBACK_MS", "250"))
+PROFILING_SECONDS = float(os.getenv("PROFILING_SECONDS", "30"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "") or tempfile.gettempdir()
+PROFILING_THREADS = int(os.getenv("PROFILING_THREADS", "0"))  # 0 = domyślny rozmiar puli
+loop_monitor = None
+thread_pool = None
+# Czas etapów handle_token (łącznie z await), obok ingest/queue_wait/handle z TokenPipeline
+handle_stages = {"dev_lookup": StageStats("dev_lookup"), "alert": StageStats("alert")}
+config_reloader = ConfigReloader(CONFIG_FILE, BASE_SETTINGS, lambda settings, overrides: apply_config(settings, overrides))
+
+async def coalesced(key, func, *args):
+    if key in in_flight:
+        metrics.RPC_COALESCED.labels(key[0]).inc()
+    return await in_flight.do(key, lambda: func(*args))
+
+async def get_token_count_by_creator(creator_address, stop_after=1):
+    # Próg w kluczu: wynik liczony do mniejszego progu nie rozstrzyga większego
+    return await coalesced(("getAssetsByCreator", creator_address, stop_after), _get_token_count_by_creator,
+                           creator_address, stop_after)
+
+async def _get_token_count_by_creator(creator_address, stop_after):
+    try:
+        return await creator_assets.count(creator_address, stop_after + 1)
+    except Exception as e:
+        # None = nieznana liczba tokenów; ponowienia i backoff są już w HeliusClient
+        log.warning("Błąd przy pobieraniu tokenów dev'a: %s", e)
+        return None
 
-def format_simple_datetime(dt):
-    return dt.strftime("%d-%m-%Y %H:%M")
+async def get_oldest_transaction_time(dev_address):
+    return await coalesced(("getSignaturesForAddress", dev_address), _get_oldest_transaction_time, dev_address)
 
-async def get_token_count_by_creator(creator_address):
+async def _get_oldest_transaction_time(dev_address):
     try:
-        payload = {
-            "jsonrpc": "2.0",
-            "id": "helius",
-            "method": "getAssetsByCreator",
-            "params": {
-                "creatorAddress": creator_address,
-                "onlyVerified": False,
-                "page": 1,
-                "limit": 50
-            }
-        }
-        response = await asyncio.to_thread(
-            requests.post, HELIUS_RPC_URL, json=payload, headers={"Content-Type": "application/json"}
-        )
-        response.raise_for_status()
-        data = response.json()
-        assets = data.get("result", {}).get("items", [])
-
-        count = 0
-        for asset in assets:
-            if asset.get("interface") == "FungibleToken":
-                count += 1
-                print(f"Znaleziono token #{count} dla dev'a {creator_address}")
-                if count > 1:
-                    return count
-        return count
+        timestamp = await signature_walker.oldest_block_time(dev_address)
     except Exception as e:
-        print(f"Błąd przy pobieraniu tokenów dev'a: {e}")
-        return 999
+        log.warning("Błąd przy pobieraniu transakcji: %s", e)
+        return None
+    if timestamp:
+        return datetime.datetime.fromtimestamp(timestamp, datetime.UTC)
+    log.debug("Brak transakcji z blockTime dla dev'a %s", dev_address)
+    return None
 
-async def get_oldest_transaction_time(dev_address):
-    attempts = 0
-    while attempts < 3:
+async def resolve_dev(dev_address, max_token_count=0):
+    stop_after = max(1, max_token_count)
+    oldest_task = None
+    if SPECULATIVE_LOOKUPS:
+        oldest_task = asyncio.create_task(get_oldest_transaction_time(dev_address))
         try:
-            payload = {
-                "jsonrpc": "2.0",
-                "id": "helius",
-                "method": "getSignaturesForAddress",
-                "params": [dev_address, {"limit": 30}]
-            }
-            response = await asyncio.to_thread(
-                requests.post, HELIUS_RPC_URL, json=payload, headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            transactions = data.get("result", [])
-            if not transactions:
-                print(f"Brak transakcji dla dev'a {dev_address}")
-                return None
-
-            oldest_tx = transactions[-1]
-            timestamp = oldest_tx.get("blockTime")
-            if timestamp:
-                return datetime.datetime.fromtimestamp(timestamp, datetime.UTC)
-            else:
-                print(f"Brak blockTime w transakcji dla {dev_address}")
-                return None
-
-        except Exception as e:
-            print(f"Błąd przy pobieraniu transakcji: {e}")
-            attempts += 1
-            await asyncio.sleep(1)
-    return None
+            token_count = await get_token_count_by_creator(dev_address, stop_after)
+        except BaseException:
+            oldest_task.cancel()
+            raise
+    else:
+        token_count = await get_token_count_by_creator(dev_address, stop_after)
+
+    if token_count is not None and token_count > max_token_count:
+        if oldest_task:
+            oldest_task.cancel()
+        return token_count, None
+
+    if oldest_task:
+        return token_count, await oldest_task
+    return token_count, await get_oldest_transaction_time(dev_address)
+
+async def store_dev(dev_address, value):
+    await state.put_dev(dev_address, value)
+    if state_store:
+        state_store.record_dev(dev_address, value, time.time() + dev_cache.ttl)
+
+async def lookup_dev(dev_address, max_token_count=0, mint=None):
+    # Rozwiązanie dev'a i zapis do cache (wspólne dla handle_token i pre-warmingu).
+    # Próg zapisujemy razem z wynikiem: liczba powyżej progu jest tylko dolnym ograniczeniem, bez daty.
+    # mint = token, przy którym liczyliśmy (None z pre-warmingu, przed launchem)
+    token_count, oldest_tx_utc = await resolve_dev(dev_address, max_token_count)
+    if token_count is None:
+        return token_count, oldest_tx_utc
+    value = (token_count, oldest_tx_utc, max_token_count, mint)
+    if mint is not None:
+        # Równoległy launch tego dev'a (inny mint) mógł dostać ten sam wynik z coalesced i zapisać go pierwszy –
+        # jego token jest wtedy wcześniejszym tokenem dev'a, którego nasze zapytanie nie widziało
+        current = await state.get_dev(dev_address)
+        if current is not None and current[3] is not None and current[3] != mint:
+            value = advance_cached_dev((token_count, oldest_tx_utc, max_token_count, current[3]), mint)
+    await store_dev(dev_address, value)
+    return value[0], value[1]
+
+def cached_dev_covers(value, max_token_count):
+    # Wpis rozstrzyga, gdy już odrzuca dev'a przy tym progu albo był liczony do progu nie niższego
+    token_count, _, checked_up_to, _ = value
+    return token_count > max_token_count or token_count <= checked_up_to
+
+def advance_cached_dev(value, mint):
+    # Wpis z poprzedniego launchu: tamten token jest już wcześniejszym tokenem dev'a, więc liczba rośnie o 1
+    token_count, oldest_tx_utc, checked_up_to, cached_mint = value
+    if cached_mint is None or cached_mint == mint:
+        return (token_count, oldest_tx_utc, checked_up_to, mint)
+    if token_count <= checked_up_to:
+        checked_up_to += 1  # dokładna liczba zostaje dokładna
+    return (token_count + 1, oldest_tx_utc, checked_up_to, mint)
 
 def get_emoji_for_time(token_creation_utc, oldest_tx_utc):
     if not token_creation_utc or not oldest_tx_utc:
@@ -106,24 +312,13 @@ def get_emoji_for_time(token_creation_utc, oldest_tx_utc):
         return "🟫"
     return ""
 
-async def handle_token(data):
+async def handle_token(data, matching=None, received_at=None):
     ca = data.get("mint")
     if not ca:
-        print(f"Brak CA, ignoruję.")
+        log.debug("Brak CA, ignoruję.")
         return
 
-    async with last_seen_cas_lock:
-        if ca in last_seen_cas_set:
-            print(f"Token {ca} już obsłużony. Ignoruję.")
-            return
-        if len(last_seen_cas_queue) >= MAX_CAS:
-            oldest_ca = last_seen_cas_queue.popleft()
-            last_seen_cas_set.remove(oldest_ca)
-        last_seen_cas_queue.append(ca)
-        last_seen_cas_set.add(ca)
-
-    print("\n--- NOWY TOKEN ---")
-    print(json.dumps(data, indent=2))
+    log.debug("--- NOWY TOKEN ---\n%s", LazyJson(data))
 
     name = data.get("name", "Brak nazwy")
     symbol = data.get("symbol", "Brak symbolu")
@@ -131,94 +326,422 @@ async def handle_token(data):
 
     initial_buy = data.get("initialBuy", 0)
     sol_amount = data.get("solAmount", 0)
-    total_supply = 1_000_000_000
-    initial_buy_percentage = (initial_buy / total_supply) * 100 if initial_buy > 0 else 0
-
-    # Warunki filtrowania – Tolerancja zwiększona do 5% (0.05)
-    is_close_to_integer = abs(initial_buy_percentage - round(initial_buy_percentage)) <= 0.05
-    is_sol_amount_close_to_integer = abs(sol_amount - round(sol_amount)) <= 0.05
-
-    if not (is_close_to_integer or is_sol_amount_close_to_integer):
-        print(f"Initial buy {initial_buy_percentage:.2f}% i solAmount {sol_amount:.2f} nie są bliskie liczbie całkowitej. Pomijam.")
-        return
+    initial_buy_percentage = compute_initial_buy_percentage(initial_buy)
 
-    if initial_buy_percentage <= 1:
-        print(f"Initial buy {initial_buy_percentage:.2f}% <= 1%. Pomijam sprawdzanie w Helius.")
+    if matching is None:
+        matching = [profile for profile in profiles if profile.passes_prefilter(initial_buy_percentage, sol_amount)]
+    if not matching:
+        metrics.EVENTS_FILTERED.labels("prefilter").inc()
+        log.debug("Initial buy %.2f%% i solAmount %.2f nie pasują do żadnego profilu. Pomijam.", initial_buy_percentage, sol_amount)
         return
 
     now = datetime.datetime.now(datetime.UTC)
 
-    async with dev_cache_lock:
-        last_checked = dev_last_checked.get(dev)
-        if last_checked and (now - last_checked).total_seconds() < CHECK_INTERVAL_SECONDS:
-            print(f"Dev {dev} był sprawdzany mniej niż 15 minut temu. Pomijam Heliusa.")
-            return
-        dev_last_checked[dev] = now
-
-    token_count = await get_token_count_by_creator(dev)
-    print(f"Dev {dev} ma {token_count} tokenów.")
-
-    if token_count >= 1:
-        print(f"Dev {dev} ma {token_count} tokenów (>=1). Ignoruję token.")
+    started = time.perf_counter()
+    max_token_count = max(profile.max_dev_token_count for profile in matching)
+    cached = await state.get_dev(dev)
+    if cached is not None and cached[3] != ca:
+        cached = advance_cached_dev(cached, ca)
+        await store_dev(dev, cached)
+    if cached is not None and cached_dev_covers(cached, max_token_count):
+        metrics.DEV_CACHE_LOOKUPS.labels("hit").inc()
+        token_count, oldest_tx_utc, _, _ = cached
+        log.debug("Dev %s jest w cache. Pomijam Heliusa.", dev)
+    else:
+        # Brak wpisu albo wpis liczony do niższego progu niż wymaga któryś z profili
+        metrics.DEV_CACHE_LOOKUPS.labels("miss" if cached is None else "below_threshold").inc()
+        token_count, oldest_tx_utc = await lookup_dev(dev, max_token_count, ca)
+    handle_stages["dev_lookup"].observe(time.perf_counter() - started)
+    log.debug("Dev %s ma %s tokenów.", dev, token_count)
+
+    matching = [profile for profile in matching if profile.accepts_dev(token_count)]
+    if not matching:
+        metrics.EVENTS_FILTERED.labels("lookup_error" if token_count is None else "dev_rejected").inc()
+        log.debug("Dev %s ma %s tokenów. Żaden profil tego nie akceptuje. Ignoruję token.", dev, token_count)
         return
 
-    display_count = token_count if token_count > 0 else 1
-
-    token_creation_utc = now
-    token_creation_pl = token_creation_utc.astimezone(pytz.timezone("Europe/Warsaw"))
-    formatted_timestamp = format_simple_datetime(token_creation_pl)
-
-    oldest_tx_utc = await get_oldest_transaction_time(dev)
-    if oldest_tx_utc:
-        oldest_tx_pl = oldest_tx_utc.astimezone(pytz.timezone("Europe/Warsaw"))
-        formatted_last_tx = format_simple_datetime(oldest_tx_pl)
+    started = time.perf_counter()
+    if token_count is None:
+        display_count = "nieznane"
     else:
-        formatted_last_tx = "Brak"
+        display_count = token_count if token_count > 0 else 1
 
+    token_creation_utc = now
     emoji = get_emoji_for_time(token_creation_utc, oldest_tx_utc)
     ca_link = f"https://neo.bullx.io/terminal?chainId=1399811149&address={ca}" if ca else "Brak linku"
+    fields = {
+        "name": name,
+        "symbol": symbol,
+        "ca": ca,
+        "ca_link": ca_link,
+        "dev_link": f"https://solscan.io/account/{dev}",
+        "created": token_creation_utc,
+        "last_tx": oldest_tx_utc or "Brak",
+        "emoji": emoji,
+        "deployed": display_count,
+        "initial_buy": f"{initial_buy_percentage:.2f}",
+    }
+
+    # Jedna wiadomość na szablon (format + strefa), wysyłana do każdego czatu, który go używa
+    messages = {}
+    sent = set()
+    for profile in matching:
+        template = get_template(profile.parse_mode, profile.timezone)
+        if (profile.chat_id, template) in sent:
+            continue
+        sent.add((profile.chat_id, template))
+        message = messages.get(template)
+        if message is None:
+            message = messages[template] = template.render(fields)
+        dispatcher.send(
+            profile.chat_id, message, seen_at=received_at, parse_mode=template.parse_mode,
+            disable_web_page_preview=True,
+        )
+    handle_stages["alert"].observe(time.perf_counter() - started)
+    profile_names = [profile.name for profile in matching]
+    for profile_name in profile_names:
+        metrics.ALERTS_QUEUED.labels(profile_name).inc()
+    log.info("Dodano do kolejki Telegrama: %s (%s)", name, symbol, extra={"mint": ca, "dev": dev, "profiles": profile_names})
+
+async def ingest_message(message, pipeline):
+    received_at = time.perf_counter()
+    metrics.FRAMES_RECEIVED.inc()
+    if not is_create_frame(message):
+        return
+    data = decoder.decode_create(message)
+    if data is None:
+        return
+    await ingest_event(data, received_at, pipeline)
 
-    message = (
-        f"*new token!*\n\n"
-        f"*Nazwa:* {name}\n"
-        f"*Symbol:* {symbol}\n"
-        f"*CA:* [{ca}]({ca_link})\n"
-        f"*Dev:* [Kliknij](https://solscan.io/account/{dev})\n"
-        f"*Data utworzenia:* {formatted_timestamp}\n"
-        f"*Data ostatniej transakcji:* {formatted_last_tx} {emoji}\n"
-        f"*Dev deployed:* {display_count}\n"
-        f"*Dev initial buy:* {initial_buy_percentage:.2f}%"
-    )
-
-    await bot.send_message(chat_id=CHAT_ID, text=message, parse_mode="Markdown", disable_web_page_preview=True)
-    print(f"Wysłano na Telegram: {name} ({symbol})")
+async def ingest_logs_message(message, pipeline):
+    received_at = time.perf_counter()
+    metrics.FRAMES_RECEIVED.inc()
+    if not is_create_notification(message):
+        return
+    data = decode_logs_notification(message)
+    if data is None:
+        return
+    await ingest_event(data, received_at, pipeline)
 
-async def listen_for_tokens():
-    uri = "wss://pumpportal.fun/api/data"
-    async with websockets.connect(uri) as websocket:
-        print("Połączono z PumpPortal i nasłuchiwanie rozpoczęte...")
+async def ingest_event(data, received_at, pipeline):
+    metrics.EVENTS_RECEIVED.inc()
 
-        payload = {"method": "subscribeNewToken"}
-        await websocket.send(json.dumps(payload))
+    ca = data.get("mint")
+    if not ca:
+        metrics.EVENTS_FILTERED.labels("no_ca").inc()
+        log.debug("Brak CA, ignoruję.")
+        return
+    # Przy kilku połączeniach ten sam mint przychodzi wielokrotnie – tu je scalamy
+    if not await state.add_seen(ca):
+        metrics.EVENTS_FILTERED.labels("duplicate").inc()
+        log.debug("Token %s już obsłużony. Ignoruję.", ca)
+        return
+    if state_store:
+        state_store.record_seen_ca(ca)
+    if prewarmer:
+        prewarmer.watch(ca, data.get("traderPublicKey"))
 
-        while True:
-            try:
-                message = await websocket.recv()
-                data = json.loads(message)
+    if prefilter:
+        prefilter.add(data, received_at)
+    else:
+        await pipeline.put(data, received_at, (None, received_at))
+
+async def listen_for_tokens(pipeline):
+    sources = {}
+    if INGEST_SOURCE in ("pumpportal", "both"):
+        async def on_message(message, slot):
+            await ingest_message(message, pipeline)
+
+        sources["pumpportal"] = (WS_ENDPOINTS, on_message, [{"method": "subscribeNewToken"}])
+    if INGEST_SOURCE in ("solana", "both"):
+        if not SOLANA_WS_URL:
+            raise ValueError("INGEST_SOURCE=solana wymaga SOLANA_WS_URL albo HELIUS_RPC_URL")
+
+        async def on_logs_message(message, slot):
+            await ingest_logs_message(message, pipeline)
+
+        sources["solana"] = ([SOLANA_WS_URL], on_logs_message, [logs_subscribe_request(commitment=SOLANA_COMMITMENT)])
+    if not sources:
+        raise ValueError(f"Nieznane źródło zdarzeń: {INGEST_SOURCE}")
+    if prewarmer:
+        sources["trades"] = (WS_ENDPOINTS, prewarmer.on_message, prewarmer.subscriptions)
+
+    for name, (endpoints, on_message, subscribe) in sources.items():
+        connection_managers[name] = ConnectionManager(
+            endpoints,
+            on_message,
+            subscribe=subscribe,
+            # Transakcje służą tylko do pre-warmingu – jedno połączenie wystarczy
+            connections=1 if name == "trades" else WS_CONNECTIONS,
+            backoff_initial=WS_BACKOFF_INITIAL_SECONDS,
+            backoff_max=WS_BACKOFF_MAX_SECONDS,
+            ping_interval=WS_PING_INTERVAL_SECONDS,
+            ping_timeout=WS_PING_INTERVAL_SECONDS,
+            stall_timeout=WS_STALL_TIMEOUT_SECONDS,
+        )
+    if prewarmer:
+        prewarmer.manager = connection_managers["trades"]
+    await asyncio.gather(*(manager.run() for manager in connection_managers.values()))
+
+async def report_stats(pipeline):
+    while True:
+        await asyncio.sleep(STATS_INTERVAL_SECONDS)
+        pipeline.log_stats()
+        if prefilter:
+            f = prefilter.stats()
+            log.info(
+                "Pre-filtr: paczki %d, zdarzenia %d, przepuszczone %d",
+                f["batches"], f["events"], f["survivors"], extra={"stats": f},
+            )
+        e = {name: stage.snapshot() for name, stage in handle_stages.items()}
+        log.info(
+            "Etapy handle_token: dev %.1f ms śr. (max %.1f), alert %.2f ms śr. (max %.2f)",
+            e["dev_lookup"]["avg_ms"], e["dev_lookup"]["max_ms"], e["alert"]["avg_ms"], e["alert"]["max_ms"],
+            extra={"stats": e},
+        )
+        if loop_monitor:
+            m = dict(loop_monitor.stats(), **executor_stats(thread_pool))
+            log.info(
+                "Pętla zdarzeń: opóźnienie %.1f ms (max %.1f), blokady %d, pula wątków %d w kolejce / %d wątków",
+                m["last_lag_ms"], m["max_lag_ms"], m["slow_callbacks"], m["queued"], m["threads"],
+                extra={"stats": m},
+            )
+        c = dev_cache.stats()
+        log.info(
+            "Cache dev'ów: %d/%d, trafienia %d, chybienia %d (%.0f%%), wyrzucone %d, wygasłe %d",
+            c["size"], c["max_entries"], c["hits"], c["misses"], c["hit_rate"] * 100,
+            c["evictions"], c["expirations"], extra={"stats": c},
+        )
+        t = dispatcher.stats()
+        log.info(
+            "Telegram: kolejka %d, wysłane %d, połączone %d, ponowienia %d, nieudane %d, odrzucone %d",
+            t["queue_depth"], t["sent"], t["merged"], t["retries"], t["failed"], t["dropped"], extra={"stats": t},
+        )
+        h = helius.stats()
+        log.info(
+            "Helius: wywołania %d, żądania HTTP %d, ponowienia %d, odrzucone %d, limit %s/s, 429 %d, bezpiecznik %s",
+            h["calls"], h["requests"], h["retries"], h["rejected"], h["rate"], h["throttles"], h["breaker"],
+            extra={"stats": h},
+        )
+        f = in_flight.stats()
+        log.info(
+            "Single-flight: w toku %d, uruchomione %d, współdzielone %d",
+            f["in_flight"], f["started"], f["shared"], extra={"stats": f},
+        )
+        s = signature_walker.stats()
+        log.info(
+            "Historia dev'ów: strony %d, z punktu kontrolnego %d, wcześniejsze wyjścia %d, punkty kontrolne %d",
+            s["pages"], s["checkpoint_hits"], s["early_exits"], s["checkpoints"], extra={"stats": s},
+        )
+        if prewarmer:
+            p = prewarmer.stats()
+            log.info(
+                "Pre-warming: obserwowane minty %d, dev'y %d, kandydaci %d, rozwiązani %d, już w cache %d, "
+                "odrzuceni %d, ustąpienia %d, błędy %d",
+                p["watched_mints"], p["watched_devs"], p["candidates"], p["warmed"], p["known"], p["dropped"],
+                p["yielded"], p["errors"], extra={"stats": p},
+            )
+        for source, manager in connection_managers.items():
+            w = manager.stats()
+            log.info(
+                "WebSocket %s: wiadomości %d, połączenia %d, ponowne %d, zawieszenia %d, błędy %d",
+                source, w["messages"], w["connects"], w["reconnects"], w["stalls"], w["message_errors"],
+                extra={"stats": w},
+            )
 
-                if data.get("txType") == "create":
-                    await handle_token(data)
+def load_state(store):
+    started = time.perf_counter()
+    keys, last_rowid = store.load_seen_snapshot()
+    seen_cas.load_keys(keys)
+    # Dopisane po ostatnim zrzucie (albo wszystko, gdy baza nie ma jeszcze zrzutu)
+    for ca in store.load_seen_cas(MAX_CAS, after_rowid=last_rowid):
+        seen_cas.add(ca)
+    now = time.time()
+    for dev, value, expires_at in store.load_dev_cache(now):
+        dev_cache.put(dev, value, ttl=expires_at - now)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    log.info("Wczytano stan: %d CA, %d dev'ów w %.1f ms", len(seen_cas), len(dev_cache), elapsed_ms)
+
+async def on_shard_event(pipeline, data, received_at, profile_names):
+    matching = None
+    if profile_names is not None:
+        # Profile z procesu ingest; nieznane nazwy (inna konfiguracja) = filtrowanie od nowa
+        by_name = {profile.name: profile for profile in profiles}
+        matching = [by_name[name] for name in profile_names if name in by_name] or None
+    await pipeline.put(data, received_at, (matching, received_at))
+
+def apply_config(settings, overrides):
+    global profiles
+    settings = dict(settings)
+    for key in PER_SHARD_SETTINGS:
+        if key in overrides:
+            settings[key] = overrides[key] / SHARD_COUNT
+    # Najpierw budujemy i sprawdzamy wszystko, co może się nie udać (profile, szablony)...
+    if settings["profiles"] is not None:
+        new_profiles = build_profiles(settings["profiles"], default_chat_id=settings["chat_id"])
+    else:
+        new_profiles = load_profiles(PROFILES_FILE or None, PROFILES, default_chat_id=settings["chat_id"])
+    for profile in new_profiles:
+        get_template(profile.parse_mode, profile.timezone)
+
+    # ...potem podmiana bez await, więc żaden token nie zobaczy połowy nowej konfiguracji
+    profiles = new_profiles
+    if settings["max_cas"] != seen_cas.capacity:
+        seen_cas.resize(settings["max_cas"])
+    if state_store:
+        state_store.keep_cas = settings["max_cas"]
+    dev_cache.resize(settings["dev_cache_max_entries"], ttl=settings["check_interval_seconds"])
+    signature_walker.checkpoints.resize(settings["dev_cache_max_entries"])
+    creator_assets.page_limit = settings["creator_page_limit"]
+    signature_walker.page_limit = settings["signatures_page_limit"]
+    signature_walker.max_pages = settings["signatures_max_pages"]
+    if helius.limiter:
+        helius.limiter.configure(
+            settings["helius_max_rps"], min_rate=settings["helius_min_rps"], increase=settings["helius_rps_increase"],
+        )
+    credits = int(settings["helius_credit_budget"])
+    if not credits:
+        helius.budget = None
+    elif helius.budget:
+        helius.budget.credits = credits
+    else:
+        helius.budget = CreditBudget(credits, HELIUS_CREDIT_PERIOD_SECONDS, method_costs=HELIUS_METHOD_CREDITS)
+    dispatcher.set_rates(settings["telegram_global_rate"], settings["telegram_chat_rate"])
+    dispatcher.merge_threshold = settings["telegram_merge_threshold"]
+    if prewarmer:
+        prewarmer.bucket.set_rate(settings["prewarm_rps"], max(1.0, settings["prewarm_rps"]))
+        prewarmer.min_sol = settings["prewarm_min_sol"]
+
+def prewarm_busy(pipeline):
+    # Ruch na żywo ma pierwszeństwo: czekające tokeny, brak zapasu w limiterze albo kończący się budżet
+    if pipeline.queue_depth() > 0:
+        return True
+    if helius.limiter and helius.limiter.headroom() < PREWARM_MIN_HEADROOM:
+        return True
+    if helius.budget and helius.budget.remaining < helius.budget.credits * PREWARM_CREDIT_RESERVE:
+        return True
+    return False
+
+def create_prewarmer(pipeline):
+    if not PREWARM_ENABLED or SHARD_MODE == "worker":
+        return None
+    if SHARD_MODE == "ingest" and STATE_BACKEND == "local":
+        # Cache dev'ów jest w workerach; bez wspólnego backendu pre-warming w ingest nic by nie dał
+        log.warning("PREWARM_ENABLED w trybie ingest wymaga STATE_BACKEND shm albo redis – pomijam")
+        return None
+    return DevPrewarmer(
+        lambda dev: lookup_dev(dev, max(profile.max_dev_token_count for profile in profiles)),
+        lambda dev: dev in dev_cache,
+        functools.partial(prewarm_busy, pipeline),
+        rate=PREWARM_RPS,
+        min_sol=PREWARM_MIN_SOL,
+        watch_seconds=PREWARM_WATCH_SECONDS,
+        max_watched=PREWARM_MAX_WATCHED,
+    )
 
-            except websockets.ConnectionClosed:
-                print("Połączenie WebSocket zostało zamknięte. Próba ponownego połączenia...")
-                await asyncio.sleep(5)
-                return await listen_for_tokens()
-            except Exception as e:
-                print(f"Błąd: {e}")
-                await asyncio.sleep(1)
+def start_profiling(tasks):
+    global loop_monitor, thread_pool
+    loop = asyncio.get_running_loop()
+    # Własna domyślna pula (asyncio.to_thread), żeby było co mierzyć od startu
+    thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=PROFILING_THREADS or None, thread_name_prefix="tgbot")
+    loop.set_default_executor(thread_pool)
+    metrics.THREAD_POOL.set_function(lambda: executor_stats(thread_pool))
+    loop_monitor = LoopMonitor(PROFILING_LAG_INTERVAL_MS / 1000, PROFILING_SLOW_CALLBACK_MS / 1000)
+    tasks.append(asyncio.create_task(loop_monitor.run()))
+    dumper = ProfileDumper(PROFILING_DIR, seconds=PROFILING_SECONDS)
+    loop.add_signal_handler(signal.SIGUSR1, dumper.start_profile)
+    loop.add_signal_handler(signal.SIGUSR2, dumper.dump_stacks)
+    log.info("Instrumentacja włączona: SIGUSR1 = profil %g s, SIGUSR2 = stosy, pliki w %s", PROFILING_SECONDS, PROFILING_DIR)
+
+async def run():
+    global state_store, prefilter, prewarmer
+    tasks = []
+    processes = []
+    if PROFILING:
+        start_profiling(tasks)
+    if STATE_DB_PATH:
+        state_store = StateStore(
+            STATE_DB_PATH, keep_cas=MAX_CAS, snapshot=seen_cas.keys, snapshot_interval=STATE_SNAPSHOT_SECONDS,
+        )
+        load_state(state_store)
+        tasks.append(asyncio.create_task(state_store.run()))
+    state.backend = create_backend(STATE_BACKEND, STATE_BACKEND_URL or None, name=STATE_BACKEND_NAME, max_cas=MAX_CAS)
+    if SHARD_MODE == "ingest":
+        addresses = list(SHARD_WORKERS)
+        if SHARD_SPAWN:
+            processes, spawned = await spawn_local_workers(
+                SHARD_SPAWN, SHARD_HOST, SHARD_BASE_PORT, metrics_port=METRICS_PORT, state_db_path=STATE_DB_PATH,
+            )
+            addresses += spawned
+        pipeline = ShardRouter(addresses, maxsize=QUEUE_MAXSIZE)
+    else:
+        pipeline = TokenPipeline(handle_token, workers=WORKER_COUNT, maxsize=QUEUE_MAXSIZE, policy=QUEUE_POLICY)
+    pipeline.start()
+    if PREFILTER_WINDOW_MS > 0 and SHARD_MODE != "worker":
+        async def emit(data, received_at, matching):
+            await pipeline.put(data, received_at, (matching, received_at))
+
+        prefilter = PrefilterBatcher(lambda: profiles, emit, window=PREFILTER_WINDOW_MS / 1000, max_batch=PREFILTER_MAX_BATCH)
+        tasks.append(asyncio.create_task(prefilter.run()))
+    prewarmer = create_prewarmer(pipeline)
+    if prewarmer:
+        tasks.append(asyncio.create_task(prewarmer.run()))
+    tasks.append(asyncio.create_task(report_stats(pipeline)))
+    if CONFIG_FILE:
+        config_reloader.reload()
+
+    def forward_signal(signum):
+        # Workery uruchomione przez ingest też przeładowują swoją konfigurację
+        for process in processes:
+            process.send_signal(signum)
+
+    config_reloader.install_signal_handler(asyncio.get_running_loop(), on_signal=forward_signal)
+
+    metrics.QUEUE_DEPTH.set_function(lambda: {
+        "pipeline": pipeline.queue_depth(),
+        "telegram": dispatcher.queue_depth(),
+    })
+    if helius.limiter:
+        metrics.RPC_RATE_LIMIT.set_function(lambda: helius.limiter.rate)
+    if helius.breaker:
+        metrics.RPC_CIRCUIT_OPEN.set_function(lambda: int(helius.breaker.state == CircuitBreaker.OPEN))
+    metrics_runner = None
+    if METRICS_PORT:
+        try:
+            app = metrics.create_app(reload=config_reloader.reload, admin_token=ADMIN_TOKEN or None)
+            metrics_runner = await metrics.start_server(app, METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            log.error("Nie udało się uruchomić serwera /metrics: %s", e)
+    try:
+        if SHARD_MODE == "worker":
+            await ShardServer(SHARD_LISTEN, functools.partial(on_shard_event, pipeline)).serve()
+        else:
+            if SHARD_MODE == "ingest" and not await pipeline.wait_connected():
+                log.warning("Nie wszystkie workery są dostępne; ich dev'y przejmą pozostałe")
+            await listen_for_tokens(pipeline)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Czekamy na zakończenie tasków, zanim zamkniemy to, z czego korzystają (m.in. bazę stanu)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await pipeline.stop()
+        await dispatcher.close()
+        await helius.close()
+        if state_store:
+            await state_store.close()
+        await state.close()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        for process in processes:
+            process.terminate()
+            await process.wait()
 
 def main():
-    asyncio.run(listen_for_tokens())
+    setup_logging(LOG_LEVEL, LOG_FORMAT)
+    try:
+        asyncio.run(run())
+    finally:
+        shutdown_logging()
 
 if __name__ == "__main__":
     main()
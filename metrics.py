@@ -0,0 +1,232 @@
+import bisect
+import logging
+import math
+
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = _CounterChild()
+        registry.register(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _CounterChild()
+        return child
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def value(self, *values):
+        child = self._children.get(values)
+        return child.value if child else 0
+
+    def render(self):
+        for values, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = _HistogramChild(self.bounds)
+        registry.register(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _HistogramChild(self.bounds)
+        return child
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def render(self):
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class GaugeFunc:
+    # Wartość liczona dopiero przy odczycie /metrics, bez kosztu na ścieżce zdarzeń
+    type = "gauge"
+
+    def __init__(self, name, help, fn=None, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        registry.register(self)
+
+    def set_function(self, fn):
+        self.fn = fn
+
+    def render(self):
+        if self.fn is None:
+            return
+        value = self.fn()
+        if isinstance(value, dict):
+            for values, item in value.items():
+                if not isinstance(values, tuple):
+                    values = (values,)
+                yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(item)}"
+        elif value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+FRAMES_RECEIVED = Counter("tgbot_ws_frames_total", "Ramki odebrane z WebSocketu")
+EVENTS_RECEIVED = Counter("tgbot_events_received_total", "Odebrane zdarzenia create")
+EVENTS_FILTERED = Counter("tgbot_events_filtered_total", "Zdarzenia odrzucone, wg powodu", ["reason"])
+DEV_CACHE_LOOKUPS = Counter("tgbot_dev_cache_lookups_total", "Odczyty cache dev'ów", ["result"])
+RPC_CALLS = Counter("tgbot_rpc_calls_total", "Wywołania Helius JSON-RPC", ["method"])
+RPC_ERRORS = Counter("tgbot_rpc_errors_total", "Błędy wywołań Helius JSON-RPC", ["method"])
+RPC_RETRIES = Counter("tgbot_rpc_retries_total", "Ponowienia wywołań Helius (429, timeout, 5xx)", ["method"])
+RPC_COALESCED = Counter("tgbot_rpc_coalesced_total", "Zapytania o dev'a dołączone do trwającego wywołania", ["method"])
+RPC_REJECTED = Counter("tgbot_rpc_rejected_total", "Wywołania odrzucone bez zapytania do Heliusa", ["reason"])
+PREWARM = Counter("tgbot_prewarm_total", "Pre-warming dev'ów z transakcji, wg wyniku", ["result"])
+RPC_HTTP_REQUESTS = Counter("tgbot_rpc_http_requests_total", "Żądania HTTP do Heliusa (paczka = jedno żądanie)")
+ALERTS_QUEUED = Counter("tgbot_alerts_queued_total", "Alerty dodane do kolejki, wg profilu", ["profile"])
+ALERTS_SENT = Counter("tgbot_alerts_sent_total", "Alerty dostarczone na Telegram")
+TELEGRAM_ERRORS = Counter("tgbot_telegram_errors_total", "Nieudane wysyłki na Telegram")
+
+STAGE_LATENCY = Histogram("tgbot_stage_latency_seconds", "Czas etapów przetwarzania", ["stage"])
+RPC_LATENCY = Histogram("tgbot_rpc_latency_seconds", "Czas wywołań Helius, wg metody", ["method"])
+ALERT_E2E_LATENCY = Histogram(
+    "tgbot_alert_e2e_latency_seconds", "Od odebrania mintu do dostarczenia na Telegram",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+
+LOOP_LAG = Histogram("tgbot_event_loop_lag_seconds", "Opóźnienie pętli zdarzeń (PROFILING=1)",
+                     buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+SLOW_CALLBACKS = Counter("tgbot_slow_callbacks_total", "Blokady pętli zdarzeń dłuższe niż próg (PROFILING=1)")
+THREAD_POOL = GaugeFunc("tgbot_thread_pool", "Domyślna pula wątków pętli (PROFILING=1)", labelnames=["state"])
+QUEUE_DEPTH = GaugeFunc("tgbot_queue_depth", "Głębokość kolejek", labelnames=["queue"])
+RPC_RATE_LIMIT = GaugeFunc("tgbot_rpc_rate_limit", "Bieżący limit zapytań do Heliusa na sekundę (AIMD)")
+RPC_CIRCUIT_OPEN = GaugeFunc("tgbot_rpc_circuit_open", "1 gdy bezpiecznik Heliusa jest otwarty")
+
+
+async def _handle_metrics(request):
+    return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+
+def _reload_handler(reload, token):
+    async def handle(request):
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return web.json_response({"error": "unauthorized"}, status=401)
+        try:
+            settings = reload()
+        except (OSError, ValueError, TypeError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response({"settings": settings})
+
+    return handle
+
+
+def create_app(reload=None, admin_token=None):
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    if reload is not None:
+        # POST /admin/reload – to samo co SIGHUP, z wynikiem w odpowiedzi
+        app.router.add_post("/admin/reload", _reload_handler(reload, admin_token))
+    return app
+
+
+async def start_server(app, host="127.0.0.1", port=9108):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    log.info("Serwer /metrics nasłuchuje na %s:%d", host, port)
+    return runner
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+POLICY_BLOCK = "block"
+POLICY_DROP_OLDEST = "drop_oldest"
+
+
+class StageStats:
+    def __init__(self, name):
+        self.histogram = metrics.STAGE_LATENCY.labels(name)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.histogram.observe(seconds)
+
+    def snapshot(self):
+        avg = self.total / self.count if self.count else 0.0
+        return {"count": self.count, "avg_ms": avg * 1000, "max_ms": self.max * 1000}
+
+
+class TokenPipeline:
+    def __init__(self, handler, workers=8, maxsize=1000, policy=POLICY_DROP_OLDEST):
+        if policy not in (POLICY_BLOCK, POLICY_DROP_OLDEST):
+            raise ValueError(f"Nieznana polityka kolejki: {policy}")
+        self.handler = handler
+        self.workers = workers
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.enqueued = 0
+        self.dropped = 0
+        self.processed = 0
+        self.errors = 0
+        self.stages = {
+            "ingest": StageStats("ingest"),
+            "queue_wait": StageStats("queue_wait"),
+            "handle": StageStats("handle"),
+        }
+        self._tasks = []
+
+    def start(self):
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def put(self, data, received_at=None, extra=()):
+        if received_at is None:
+            received_at = time.perf_counter()
+        item = (received_at, data, extra)
+        if self.policy == POLICY_BLOCK:
+            await self.queue.put(item)
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except asyncio.QueueFull:
+                    try:
+                        self.queue.get_nowait()
+                        self.queue.task_done()
+                        self.dropped += 1
+                        metrics.EVENTS_FILTERED.labels("queue_overflow").inc()
+                    except asyncio.QueueEmpty:
+                        pass
+        self.enqueued += 1
+        self.stages["ingest"].observe(time.perf_counter() - received_at)
+
+    async def _worker(self, worker_id):
+        while True:
+            received_at, data, extra = await self.queue.get()
+            started = time.perf_counter()
+            self.stages["queue_wait"].observe(started - received_at)
+            try:
+                await self.handler(data, *extra)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                log.exception("Błąd w workerze %d: %s", worker_id, e)
+            finally:
+                self.stages["handle"].observe(time.perf_counter() - started)
+                self.queue.task_done()
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_maxsize": self.queue.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "errors": self.errors,
+            "stages": {name: stage.snapshot() for name, stage in self.stages.items()},
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        stages = ", ".join(
+            f"{name}: avg {st['avg_ms']:.1f} ms / max {st['max_ms']:.1f} ms"
+            for name, st in s["stages"].items()
+        )
+        log.info(
+            "Kolejka: %d/%d, przyjęte %d, odrzucone %d, obsłużone %d, błędy %d | %s",
+            s["queue_depth"], s["queue_maxsize"], s["enqueued"], s["dropped"], s["processed"], s["errors"], stages,
+            extra={"stats": s},
+        )
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import metrics
+from profiles import TOTAL_SUPPLY, initial_buy_percentage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def evaluate_batch(events, profiles):
+    # Zwraca [(indeks zdarzenia, [pasujące profile])] dla zdarzeń, które przeszły choć jeden profil
+    if not events or not profiles:
+        return []
+    if np is None:
+        survivors = []
+        for i, data in enumerate(events):
+            pct = initial_buy_percentage(_number(data.get("initialBuy", 0)))
+            sol_amount = _number(data.get("solAmount", 0))
+            matching = [profile for profile in profiles if profile.passes_prefilter(pct, sol_amount)]
+            if matching:
+                survivors.append((i, matching))
+        return survivors
+
+    n = len(events)
+    initial_buy = np.fromiter((_number(data.get("initialBuy", 0)) for data in events), dtype=np.float64, count=n)
+    sol_amount = np.fromiter((_number(data.get("solAmount", 0)) for data in events), dtype=np.float64, count=n)
+    pct = np.where(initial_buy > 0, initial_buy / TOTAL_SUPPLY * 100, 0.0)
+    pct_distance = np.abs(pct - np.round(pct))
+    sol_distance = np.abs(sol_amount - np.round(sol_amount))
+
+    # Macierz profile x zdarzenia w jednym przebiegu
+    tolerance = np.array([profile.tolerance for profile in profiles])[:, None]
+    min_pct = np.array([profile.min_initial_buy_pct for profile in profiles])[:, None]
+    mask = ((pct_distance <= tolerance) | (sol_distance <= tolerance)) & (pct > min_pct)
+
+    survivors = []
+    for i in np.flatnonzero(mask.any(axis=0)):
+        survivors.append((int(i), [profiles[j] for j in np.flatnonzero(mask[:, i])]))
+    return survivors
+
+
+class PrefilterBatcher:
+    def __init__(self, get_profiles, emit, window=0.005, max_batch=512):
+        self.get_profiles = get_profiles
+        self.emit = emit
+        self.window = window
+        self.max_batch = max_batch
+        self._batch = []
+        self._has_events = asyncio.Event()
+        self._full = asyncio.Event()
+        self.batches = 0
+        self.events = 0
+        self.survivors = 0
+
+    def add(self, data, received_at):
+        self._batch.append((data, received_at))
+        self._has_events.set()
+        if len(self._batch) >= self.max_batch:
+            self._full.set()
+
+    async def run(self):
+        while True:
+            await self._has_events.wait()
+            if len(self._batch) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.window)
+                except asyncio.TimeoutError:
+                    pass
+            self._has_events.clear()
+            self._full.clear()
+            batch, self._batch = self._batch, []
+            await self.flush(batch)
+
+    async def flush(self, batch):
+        started = time.perf_counter()
+        survivors = evaluate_batch([data for data, _ in batch], self.get_profiles())
+        metrics.STAGE_LATENCY.labels("filter").observe(time.perf_counter() - started)
+        metrics.EVENTS_FILTERED.labels("prefilter").inc(len(batch) - len(survivors))
+        self.batches += 1
+        self.events += len(batch)
+        self.survivors += len(survivors)
+        for i, matching in survivors:
+            data, received_at = batch[i]
+            await self.emit(data, received_at, matching)
+
+    def stats(self):
+        return {"batches": self.batches, "events": self.events, "survivors": self.survivors}
@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+from collections import OrderedDict
+
+import metrics
+from rate_limit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+# Priorytety kandydatów (mniejszy = pierwszy)
+PRIORITY_DEV_SELL = 0  # dev świeżego tokena sprzedaje – typowo zbiera SOL na kolejny launch
+PRIORITY_LARGE_SELL = 1  # duża sprzedaż na świeżym tokenie, portfel może zaraz coś wypuścić
+
+
+class DevPrewarmer:
+    # Obserwuje transakcje świeżych tokenów i kont ich dev'ów (subscribeTokenTrade / subscribeAccountTrade
+    # w PumpPortal) i w tle rozwiązuje portfele, które wyglądają na szykujące launch, zanim przyjdzie create.
+    # Własny, niski limit zapytań; ustępuje, gdy is_busy() mówi, że ruch na żywo czeka.
+    def __init__(self, resolve, is_known, is_busy, rate=2.0, min_sol=1.0, watch_seconds=600, max_watched=500,
+                 max_pending=1000, busy_delay=0.05, clock=time.monotonic):
+        self.resolve = resolve
+        self.is_known = is_known
+        self.is_busy = is_busy
+        self.bucket = TokenBucket(rate, max(1.0, rate))
+        self.min_sol = min_sol
+        self.watch_seconds = watch_seconds
+        self.max_watched = max_watched
+        self.max_pending = max_pending
+        self.busy_delay = busy_delay
+        self.clock = clock
+        self.manager = None
+        self.watched_mints = OrderedDict()  # mint -> (dev, expires_at)
+        self.watched_devs = OrderedDict()  # dev -> expires_at
+        self._subscribe = {"subscribeTokenTrade": [], "subscribeAccountTrade": []}
+        self._unsubscribe = {"unsubscribeTokenTrade": [], "unsubscribeAccountTrade": []}
+        self._heap = []
+        self._pending = set()
+        self._seq = itertools.count()
+        self._ready = asyncio.Event()
+        self.trades = 0
+        self.candidates = 0
+        self.warmed = 0
+        self.known = 0
+        self.dropped = 0
+        self.yielded = 0
+        self.errors = 0
+
+    def subscriptions(self):
+        # Pełna lista przy (ponownym) połączeniu; przyrosty idą przez manager.send
+        payloads = []
+        if self.watched_mints:
+            payloads.append({"method": "subscribeTokenTrade", "keys": list(self.watched_mints)})
+        if self.watched_devs:
+            payloads.append({"method": "subscribeAccountTrade", "keys": list(self.watched_devs)})
+        return payloads
+
+    def watch(self, mint, dev):
+        # Wołane dla każdego nowego create (przed pre-filtrem) – tanie, bez I/O
+        expires_at = self.clock() + self.watch_seconds
+        if mint and mint not in self.watched_mints:
+            self.watched_mints[mint] = (dev, expires_at)
+            self._subscribe["subscribeTokenTrade"].append(mint)
+            if len(self.watched_mints) > self.max_watched:
+                old, _ = self.watched_mints.popitem(last=False)
+                self._unsubscribe["unsubscribeTokenTrade"].append(old)
+        if dev:
+            if dev not in self.watched_devs:
+                self._subscribe["subscribeAccountTrade"].append(dev)
+            self.watched_devs[dev] = expires_at
+            self.watched_devs.move_to_end(dev)
+            if len(self.watched_devs) > self.max_watched:
+                old, _ = self.watched_devs.popitem(last=False)
+                self._unsubscribe["unsubscribeAccountTrade"].append(old)
+
+    def on_trade(self, data):
+        if not isinstance(data, dict) or data.get("txType") != "sell":
+            return
+        self.trades += 1
+        trader = data.get("traderPublicKey")
+        if not trader:
+            return
+        watched = self.watched_mints.get(data.get("mint"))
+        if trader in self.watched_devs or (watched and watched[0] == trader):
+            priority = PRIORITY_DEV_SELL
+        elif (data.get("solAmount") or 0) >= self.min_sol:
+            priority = PRIORITY_LARGE_SELL
+        else:
+            return
+        self.enqueue(trader, priority)
+
+    def enqueue(self, dev, priority=PRIORITY_LARGE_SELL):
+        if dev in self._pending:
+            return
+        if len(self._heap) >= self.max_pending:
+            # Pełna kolejka: przyjmujemy tylko kandydatów o najwyższym priorytecie
+            if priority > PRIORITY_DEV_SELL:
+                self.dropped += 1
+                metrics.PREWARM.labels("dropped").inc()
+                return
+        self.candidates += 1
+        self._pending.add(dev)
+        heapq.heappush(self._heap, (priority, next(self._seq), dev))
+        self._ready.set()
+
+    async def on_message(self, message, slot):
+        # Kupna odrzucamy bez dekodowania JSON
+        marker = b'"sell"' if isinstance(message, bytes) else '"sell"'
+        if marker not in message:
+            return
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        self.on_trade(data)
+
+    async def _next(self):
+        while not self._heap:
+            self._ready.clear()
+            await self._ready.wait()
+        _, _, dev = heapq.heappop(self._heap)
+        self._pending.discard(dev)
+        return dev
+
+    async def run(self):
+        tasks = [asyncio.create_task(self._subscriber()), asyncio.create_task(self._worker())]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _worker(self):
+        while True:
+            dev = await self._next()
+            if self.is_known(dev):
+                self.known += 1
+                metrics.PREWARM.labels("known").inc()
+                continue
+            await self.bucket.acquire()
+            # Alerty na żywo mają pierwszeństwo: czekamy, aż kolejka i limiter Heliusa będą wolne
+            while self._busy():
+                self.yielded += 1
+                await asyncio.sleep(self.busy_delay)
+            if self.is_known(dev):
+                self.known += 1
+                metrics.PREWARM.labels("known").inc()
+                continue
+            try:
+                await self.resolve(dev)
+            except Exception as e:
+                self.errors += 1
+                metrics.PREWARM.labels("error").inc()
+                log.debug("Pre-warming dev'a %s nieudany: %s", dev, e)
+                continue
+            self.warmed += 1
+            metrics.PREWARM.labels("warmed").inc()
+
+    def _busy(self):
+        # Błąd w is_busy traktujemy jak zajętość – pre-warming czeka, ale nie umiera
+        try:
+            return self.is_busy()
+        except Exception as e:
+            self.errors += 1
+            log.warning("Błąd przy sprawdzaniu obciążenia, wstrzymuję pre-warming: %s", e)
+            return True
+
+    def _expire(self):
+        now = self.clock()
+        while self.watched_mints:
+            mint, (_, expires_at) = next(iter(self.watched_mints.items()))
+            if expires_at > now:
+                break
+            del self.watched_mints[mint]
+            self._unsubscribe["unsubscribeTokenTrade"].append(mint)
+        while self.watched_devs:
+            dev, expires_at = next(iter(self.watched_devs.items()))
+            if expires_at > now:
+                break
+            del self.watched_devs[dev]
+            self._unsubscribe["unsubscribeAccountTrade"].append(dev)
+
+    async def _subscriber(self, interval=1.0):
+        # Zmiany subskrypcji zbierane i wysyłane raz na sekundę, po jednej ramce na metodę
+        while True:
+            await asyncio.sleep(interval)
+            self._expire()
+            for pending in (self._unsubscribe, self._subscribe):
+                for method, keys in pending.items():
+                    if not keys:
+                        continue
+                    pending[method] = []
+                    if self.manager is not None:
+                        await self.manager.send({"method": method, "keys": keys})
+
+    def stats(self):
+        return {
+            "watched_mints": len(self.watched_mints),
+            "watched_devs": len(self.watched_devs),
+            "pending": len(self._heap),
+            "trades": self.trades,
+            "candidates": self.candidates,
+            "warmed": self.warmed,
+            "known": self.known,
+            "dropped": self.dropped,
+            "yielded": self.yielded,
+            "errors": self.errors,
+        }
@@ -0,0 +1,73 @@
+import json
+import os
+
+TOTAL_SUPPLY = 1_000_000_000
+
+# Odpowiedniki dawnych osobnych skryptów main.py, lol4.py i gemy2.py
+BUILTIN_PROFILES = {
+    "main": {"tolerance": 0.05},
+    "lol4": {"tolerance": 0.02},
+    "gemy2": {"tolerance": 0.02},
+}
+
+
+class Profile:
+    def __init__(self, name, tolerance=0.05, min_initial_buy_pct=1.0, max_dev_token_count=0, chat_id=None,
+                 accept_unknown_dev=False, parse_mode="Markdown", timezone="Europe/Warsaw"):
+        self.name = name
+        # Maksymalna odległość initialBuy % i solAmount od liczby całkowitej
+        self.tolerance = tolerance
+        # Initial buy musi być ściśle większy niż ten próg
+        self.min_initial_buy_pct = min_initial_buy_pct
+        self.max_dev_token_count = max_dev_token_count
+        self.chat_id = chat_id
+        # Gdy Helius nie odpowie (limit, awaria), liczba tokenów dev'a jest nieznana – domyślnie bez alertu;
+        # alert mimo to tylko dla profili z jawnym "accept_unknown_dev": true
+        self.accept_unknown_dev = accept_unknown_dev
+        # Format alertu (Markdown, MarkdownV2, HTML) i strefa czasowa dat w wiadomości
+        self.parse_mode = parse_mode
+        self.timezone = timezone
+
+    def __repr__(self):
+        return f"Profile({self.name!r}, tolerance={self.tolerance}, chat_id={self.chat_id!r})"
+
+    def passes_prefilter(self, initial_buy_percentage, sol_amount):
+        is_close_to_integer = abs(initial_buy_percentage - round(initial_buy_percentage)) <= self.tolerance
+        is_sol_amount_close_to_integer = abs(sol_amount - round(sol_amount)) <= self.tolerance
+        if not (is_close_to_integer or is_sol_amount_close_to_integer):
+            return False
+        return initial_buy_percentage > self.min_initial_buy_pct
+
+    def accepts_dev(self, token_count):
+        if token_count is None:
+            return self.accept_unknown_dev
+        return token_count <= self.max_dev_token_count
+
+
+def initial_buy_percentage(initial_buy):
+    return (initial_buy / TOTAL_SUPPLY) * 100 if initial_buy > 0 else 0
+
+
+def load_profiles(path=None, names=("main",), default_chat_id=None):
+    if path:
+        with open(path) as f:
+            raw = json.load(f)
+    else:
+        raw = []
+        for name in names:
+            if name not in BUILTIN_PROFILES:
+                raise ValueError(f"Nieznany profil: {name}")
+            raw.append(dict(BUILTIN_PROFILES[name], name=name))
+    return build_profiles(raw, default_chat_id)
+
+
+def build_profiles(raw, default_chat_id=None):
+    profiles = []
+    for entry in raw:
+        entry = dict(entry)
+        name = entry.pop("name")
+        chat_id = entry.pop("chat_id", None) or os.getenv(f"CHAT_ID_{name.upper()}") or default_chat_id
+        profiles.append(Profile(name, chat_id=chat_id, **entry))
+    if not profiles:
+        raise ValueError("Brak profili filtrowania")
+    return profiles
@@ -0,0 +1,132 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    # Opóźnienie pętli: task śpi `interval` i mierzy, o ile później się obudził.
+    # Osobny wątek pilnuje bicia serca – gdy pętla stoi dłużej niż `slow_threshold`,
+    # zrzuca stos wątku pętli w trakcie blokady (czyli kod, który ją blokuje).
+    def __init__(self, interval=0.1, slow_threshold=0.25, stack_limit=30):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.stack_limit = stack_limit
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.slow_callbacks = 0
+        self._beat = time.monotonic()
+        self._reported = None
+        self._thread_id = None
+        self._stop = threading.Event()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                started = loop.time()
+                self._beat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, loop.time() - started - self.interval)
+                self.last_lag = lag
+                if lag > self.max_lag:
+                    self.max_lag = lag
+                metrics.LOOP_LAG.observe(lag)
+        finally:
+            self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.slow_threshold or beat == self._reported:
+                continue
+            self._reported = beat
+            frame = sys._current_frames().get(self._thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=self.stack_limit)) if frame else ""
+            self.slow_callbacks += 1
+            metrics.SLOW_CALLBACKS.inc()
+            log.warning("Pętla zdarzeń zablokowana od %.0f ms", stalled * 1000, extra={"stack": stack})
+
+    def stats(self):
+        return {
+            "last_lag_ms": self.last_lag * 1000,
+            "max_lag_ms": self.max_lag * 1000,
+            "slow_callbacks": self.slow_callbacks,
+        }
+
+
+def executor_stats(executor):
+    # ThreadPoolExecutor nie ma publicznego API do głębokości kolejki
+    if executor is None:
+        return {"queued": 0, "threads": 0}
+    return {"queued": executor._work_queue.qsize(), "threads": len(executor._threads)}
+
+
+class ProfileDumper:
+    # Na żądanie (sygnał): cProfile wątku pętli przez `seconds` albo zrzut stosów tasków i wątków.
+    # Bot działa dalej; wyniki lądują w `directory` i skrót w logu.
+    def __init__(self, directory, seconds=30.0, top=25):
+        self.directory = directory
+        self.seconds = seconds
+        self.top = top
+        self._profiler = None
+
+    def _path(self, kind, suffix):
+        return os.path.join(self.directory, f"tgbot-{os.getpid()}-{kind}-{time.strftime('%Y%m%d-%H%M%S')}.{suffix}")
+
+    def start_profile(self):
+        if self._profiler is not None:
+            log.info("Profilowanie już trwa")
+            return
+        # Wołane z handlera sygnału w pętli, więc profilujemy wątek pętli
+        self._profiler = cProfile.Profile()
+        try:
+            self._profiler.enable()
+        except ValueError as e:
+            self._profiler = None
+            log.warning("Nie udało się włączyć profilera: %s", e)
+            return
+        log.info("Profilowanie pętli przez %g s", self.seconds)
+        asyncio.get_running_loop().call_later(self.seconds, self._finish_profile)
+
+    def _finish_profile(self):
+        profiler, self._profiler = self._profiler, None
+        profiler.disable()
+        path = self._path("profile", "prof")
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.top)
+        log.info("Zapisano profil %s", path, extra={"profile": out.getvalue()})
+
+    def dump_stacks(self):
+        out = io.StringIO()
+        tasks = asyncio.all_tasks()
+        out.write(f"# Taski asyncio: {len(tasks)}\n")
+        for task in tasks:
+            out.write(f"\n{task!r}\n")
+            task.print_stack(limit=20, file=out)
+        frames = sys._current_frames()
+        out.write(f"\n# Wątki: {len(frames)}\n")
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            out.write(f"\n--- {names.get(ident, ident)}\n")
+            out.write("".join(traceback.format_stack(frame)))
+        path = self._path("stacks", "txt")
+        with open(path, "w") as f:
+            f.write(out.getvalue())
+        log.info("Zapisano stosy %d tasków i %d wątków do %s", len(tasks), len(frames), path)
@@ -0,0 +1,177 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate, capacity=None):
+        # Zmiana tempa w locie: tokeny naliczone dotąd zostają, najwyżej przycięte do nowej pojemności
+        self._refill()
+        self.rate = rate
+        if capacity is not None:
+            self.capacity = capacity
+        self.tokens = min(self.tokens, self.capacity)
+
+    async def acquire(self, n=1):
+        while True:
+            self._refill()
+            if self.tokens >= n:
+                self.tokens -= n
+                return
+            await asyncio.sleep((n - self.tokens) / self.rate)
+
+
+class AdaptiveRateLimiter:
+    # AIMD: co sekundę bez 429 tempo rośnie o `increase`, po 429 spada `decrease` razy
+    def __init__(self, max_rate, min_rate=1.0, increase=1.0, decrease=0.5, clock=time.monotonic):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.clock = clock
+        self.bucket = TokenBucket(max_rate, max(1.0, max_rate), clock)
+        self.paused_until = 0.0
+        self._last_change = clock()
+        self.throttles = 0
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def _set_rate(self, rate):
+        self.bucket.set_rate(rate, max(1.0, rate))
+
+    def configure(self, max_rate, min_rate=None, increase=None):
+        self.max_rate = max_rate
+        if min_rate is not None:
+            self.min_rate = min(min_rate, max_rate)
+        if increase is not None:
+            self.increase = increase
+        self._set_rate(min(self.max_rate, max(self.min_rate, self.rate)))
+
+    async def acquire(self, n=1):
+        delay = self.paused_until - self.clock()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.bucket.acquire(n)
+
+    def headroom(self):
+        # Część pojemności kubełka dostępna od ręki (0..1); niski priorytet czeka na zapas
+        if self.paused_until > self.clock():
+            return 0.0
+        self.bucket._refill()
+        return self.bucket.tokens / self.bucket.capacity
+
+    def on_success(self):
+        now = self.clock()
+        if self.rate < self.max_rate and now - self._last_change >= 1.0:
+            self._set_rate(min(self.max_rate, self.rate + self.increase))
+            self._last_change = now
+
+    def on_throttle(self, retry_after=None):
+        now = self.clock()
+        self.throttles += 1
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        # Wiele równoległych 429 z jednej serii liczymy jako jedno zdarzenie
+        if now - self._last_change >= 1.0 or self.rate == self.max_rate:
+            self._set_rate(max(self.min_rate, self.rate * self.decrease))
+            self._last_change = now
+
+
+class CreditBudget:
+    def __init__(self, credits, period=86400.0, method_costs=None, default_cost=1, clock=time.monotonic):
+        self.credits = credits
+        self.period = period
+        self.method_costs = method_costs or {}
+        self.default_cost = default_cost
+        self.clock = clock
+        self.spent = 0
+        self.window_started = clock()
+
+    def cost(self, method):
+        return self.method_costs.get(method, self.default_cost)
+
+    def _roll(self):
+        now = self.clock()
+        if now - self.window_started >= self.period:
+            self.window_started = now
+            self.spent = 0
+
+    def can_spend(self, method):
+        self._roll()
+        return self.spent + self.cost(method) <= self.credits
+
+    def try_spend(self, method):
+        if not self.can_spend(method):
+            return False
+        self.spent += self.cost(method)
+        return True
+
+    @property
+    def remaining(self):
+        return max(0, self.credits - self.spent)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probe_in_flight = False
+
+    def allow(self):
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if self.clock() - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        # Półotwarty: przepuszczamy jedno zapytanie próbne
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def probe(self):
+        # Wywołane zaraz po allow(): numer otwarcia, jeśli przepuszczone zapytanie jest próbą, inaczej None
+        return self.opens if self.state == self.HALF_OPEN else None
+
+    def release_probe(self, probe):
+        # Próba zakończona bez werdyktu (anulowanie, błąd spoza Heliusa) – następne zapytanie może próbować
+        if probe is not None and self.state == self.HALF_OPEN and self.opens == probe:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opens += 1
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+            self._probe_in_flight = False
@@ -0,0 +1,222 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def parse_address(value, default_host="127.0.0.1"):
+    host, _, port = value.rpartition(":")
+    return host or default_host, int(port)
+
+
+class HashRing:
+    # Spójne haszowanie: dodanie/usunięcie workera przenosi tylko ~1/N dev'ów
+    def __init__(self, nodes, replicas=64):
+        self.nodes = list(nodes)
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key, exclude=()):
+        if not self._hashes:
+            return None
+        start = bisect.bisect(self._hashes, _hash(key))
+        for i in range(len(self._owners)):
+            node = self._owners[(start + i) % len(self._owners)]
+            if node not in exclude:
+                return node
+        return None
+
+
+class ShardRouter:
+    # Strona ingest: zdarzenia trafiają do workera wybranego po pubkey dev'a,
+    # więc cache dev'a zostaje w jednym procesie. Interfejs jak TokenPipeline (put/start/stop/stats).
+    # Ramki: JSON w liniach, {"event", "received_ts", "profiles"}.
+    def __init__(self, addresses, maxsize=1000, backoff_initial=0.1, backoff_max=5.0, replicas=64, max_lines=512):
+        if not addresses:
+            raise ValueError("Brak adresów workerów")
+        self.addresses = list(addresses)
+        self.ring = HashRing(self.addresses, replicas)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.max_lines = max_lines
+        self.queues = {address: asyncio.Queue(maxsize=maxsize) for address in self.addresses}
+        self.connected = set()
+        self.routed = dict.fromkeys(self.addresses, 0)
+        self.rerouted = 0
+        self.dropped = 0
+        self.lost = 0
+        self._tasks = []
+
+    def start(self):
+        for address in self.addresses:
+            self._tasks.append(asyncio.create_task(self._sender(address)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def wait_connected(self, timeout=30.0, interval=0.1):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(self.connected) < len(self.addresses) and loop.time() < deadline:
+            await asyncio.sleep(interval)
+        return len(self.connected) == len(self.addresses)
+
+    async def put(self, data, received_at=None, extra=()):
+        if received_at is None:
+            received_at = time.perf_counter()
+        matching = extra[0] if extra else None
+        key = data.get("traderPublicKey") or data.get("mint") or ""
+        owner = self.ring.node_for(key)
+        address = owner
+        if owner not in self.connected:
+            # Worker niedostępny – dev'a przejmuje kolejny na pierścieniu
+            down = [a for a in self.addresses if a not in self.connected]
+            address = self.ring.node_for(key, exclude=down) or owner
+            if address != owner:
+                self.rerouted += 1
+        line = json.dumps({
+            "event": data,
+            "received_ts": time.time() - (time.perf_counter() - received_at),
+            "profiles": [profile.name for profile in matching] if matching is not None else None,
+        }) + "\n"
+        queue = self.queues[address]
+        while True:
+            try:
+                queue.put_nowait(line)
+                break
+            except asyncio.QueueFull:
+                try:
+                    queue.get_nowait()
+                    self.dropped += 1
+                    metrics.EVENTS_FILTERED.labels("queue_overflow").inc()
+                except asyncio.QueueEmpty:
+                    pass
+        self.routed[address] += 1
+
+    async def _sender(self, address):
+        host, port = parse_address(address)
+        queue = self.queues[address]
+        attempt = 0
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except OSError as e:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_initial * 2 ** attempt))
+                attempt += 1
+                log.debug("Worker %s niedostępny (%s), ponowię za %.1f s", address, e, delay)
+                await asyncio.sleep(delay)
+                continue
+            attempt = 0
+            self.connected.add(address)
+            log.info("Połączono z workerem %s", address)
+            lines = []
+            try:
+                while True:
+                    lines = [await queue.get()]
+                    while len(lines) < self.max_lines and not queue.empty():
+                        lines.append(queue.get_nowait())
+                    # Worker nic nie wysyła, więc EOF oznacza zamknięte połączenie
+                    if reader.at_eof():
+                        raise ConnectionResetError("worker zamknął połączenie")
+                    writer.write("".join(lines).encode())
+                    await writer.drain()
+                    lines = []
+            except (OSError, ConnectionError) as e:
+                self.lost += len(lines)
+                log.warning("Utracono połączenie z workerem %s: %s", address, e)
+            finally:
+                self.connected.discard(address)
+                writer.close()
+
+    def queue_depth(self):
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth(),
+            "workers": len(self.addresses),
+            "connected": len(self.connected),
+            "routed": dict(self.routed),
+            "rerouted": self.rerouted,
+            "dropped": self.dropped,
+            "lost": self.lost,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        log.info(
+            "Sharding: kolejka %d, workery %d/%d, przekazane %d, przekierowane %d, odrzucone %d, utracone %d",
+            s["queue_depth"], s["connected"], s["workers"], sum(s["routed"].values()), s["rerouted"],
+            s["dropped"], s["lost"], extra={"stats": s},
+        )
+
+
+class ShardServer:
+    # Strona workera: przyjmuje ramki od procesu ingest i przekazuje je do on_event
+    def __init__(self, address, on_event):
+        self.address = address
+        self.on_event = on_event
+        self.received = 0
+        self.bad_frames = 0
+
+    async def serve(self):
+        host, port = parse_address(self.address)
+        server = await asyncio.start_server(self._handle, host, port, limit=16 * 1024 ** 2)
+        log.info("Worker nasłuchuje na %s", self.address)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        log.info("Połączenie od procesu ingest %s", peer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    frame = json.loads(line)
+                    age = max(0.0, time.time() - frame["received_ts"])
+                except (ValueError, KeyError, TypeError):
+                    self.bad_frames += 1
+                    continue
+                self.received += 1
+                await self.on_event(frame["event"], time.perf_counter() - age, frame.get("profiles"))
+        except (OSError, ConnectionError) as e:
+            log.warning("Błąd połączenia od %s: %s", peer, e)
+        finally:
+            writer.close()
+
+
+async def spawn_local_workers(count, host="127.0.0.1", base_port=9200, metrics_port=0, state_db_path=""):
+    # Workery jako osobne procesy na tym hoście; dziedziczą środowisko (profile, klucze API)
+    processes = []
+    addresses = []
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    for i in range(count):
+        address = f"{host}:{base_port + i}"
+        env = dict(os.environ, SHARD_MODE="worker", SHARD_LISTEN=address, SHARD_COUNT=str(count), SHARD_SPAWN="0")
+        env["METRICS_PORT"] = str(metrics_port + 1 + i) if metrics_port else "0"
+        env["STATE_DB_PATH"] = f"{state_db_path}.shard{i}" if state_db_path else ""
+        processes.append(await asyncio.create_subprocess_exec(
+            sys.executable, "-c", "from main import main; main()", env=env, cwd=cwd,
+        ))
+        addresses.append(address)
+    return processes, addresses
@@ -0,0 +1,219 @@
+import contextlib
+import datetime
+import fcntl
+import hashlib
+import logging
+import math
+import os
+import struct
+import tempfile
+import time
+
+from dedup import SharedMintDedup, b58encode, mint_key
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+log = logging.getLogger(__name__)
+
+BACKEND_LOCAL = "local"
+BACKEND_SHM = "shm"
+BACKEND_REDIS = "redis"
+
+
+NO_MINT = bytes(32)
+
+
+def _encode_dev(value):
+    token_count, oldest_tx_utc, checked_up_to, mint = value
+    oldest = oldest_tx_utc.timestamp() if oldest_tx_utc else None
+    return token_count, oldest, checked_up_to, mint
+
+
+def _decode_dev(token_count, oldest, checked_up_to, mint):
+    oldest_tx_utc = datetime.datetime.fromtimestamp(oldest, datetime.UTC) if oldest is not None else None
+    return token_count, oldest_tx_utc, checked_up_to, mint or None
+
+
+class SharedMemoryDevTable:
+    # Cache dev'ów w shared_memory: tablica bezpośrednio mapowana (hash klucza -> slot),
+    # kolizja nadpisuje starszy wpis. Rekord: klucz, expires_at, token_count, oldest_tx (NaN = brak),
+    # próg, do którego liczono tokeny, mint, przy którym liczono (zera = brak).
+    # Zmiana układu = nowy LAYOUT, więc stary segment nie zostanie źle odczytany.
+    RECORD = struct.Struct("<32sdqdq32s")
+    LAYOUT = 3
+
+    def __init__(self, name, slots, lock_path=None):
+        from multiprocessing import resource_tracker, shared_memory
+
+        size = 1
+        while size < slots:
+            size <<= 1
+        self._mask = size - 1
+        total = size * self.RECORD.size
+        self._lock_file = open(lock_path or os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a+b")
+        with self._locked():
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+                if self._shm.size < total:
+                    raise ValueError(f"Segment {name} jest mniejszy niż {total} B")
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+
+    @contextlib.contextmanager
+    def _locked(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _offset(self, key):
+        slot = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") & self._mask
+        return slot * self.RECORD.size
+
+    def get(self, dev, now=None):
+        key = mint_key(dev)
+        offset = self._offset(key)
+        with self._locked():
+            stored_key, expires_at, token_count, oldest, checked_up_to, mint = self.RECORD.unpack_from(
+                self._shm.buf, offset,
+            )
+        if stored_key != key or expires_at <= (time.time() if now is None else now):
+            return None
+        value = _decode_dev(
+            token_count, None if math.isnan(oldest) else oldest, checked_up_to,
+            b58encode(mint) if mint != NO_MINT else None,
+        )
+        return value, expires_at
+
+    def put(self, dev, value, expires_at):
+        token_count, oldest, checked_up_to, mint = _encode_dev(value)
+        key = mint_key(dev)
+        offset = self._offset(key)
+        with self._locked():
+            self.RECORD.pack_into(
+                self._shm.buf, offset, key, expires_at, token_count, math.nan if oldest is None else oldest,
+                checked_up_to, mint_key(mint) if mint else NO_MINT,
+            )
+
+    def close(self):
+        self._shm.close()
+        self._lock_file.close()
+
+
+class SharedMemoryBackend:
+    def __init__(self, name="tgbot", max_cas=1_000_000, dev_slots=262_144):
+        self.cas = SharedMintDedup(f"{name}_cas", max_cas)
+        self.devs = SharedMemoryDevTable(f"{name}_dev_v{SharedMemoryDevTable.LAYOUT}", dev_slots)
+
+    async def seen_add(self, ca):
+        return self.cas.add(ca)
+
+    async def dev_get(self, dev):
+        return self.devs.get(dev)
+
+    async def dev_put(self, dev, value, ttl):
+        self.devs.put(dev, value, time.time() + ttl)
+
+    async def close(self):
+        self.cas.close()
+        self.devs.close()
+
+
+class RedisBackend:
+    # Dowolny serwer zgodny z Redisem (SET NX EX, GET); lokalnie bench/fake_redis.py
+    def __init__(self, url, prefix="tgbot:", ca_ttl=86400):
+        if aioredis is None:
+            raise RuntimeError("STATE_BACKEND=redis wymaga pakietu redis")
+        self.client = aioredis.from_url(url)
+        self.prefix = prefix
+        self.ca_ttl = ca_ttl
+
+    async def seen_add(self, ca):
+        return bool(await self.client.set(f"{self.prefix}ca:{ca}", 1, nx=True, ex=self.ca_ttl))
+
+    async def dev_get(self, dev):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(f"{self.prefix}dev:{dev}")
+            pipe.ttl(f"{self.prefix}dev:{dev}")
+            raw, ttl = await pipe.execute()
+        if raw is None:
+            return None
+        # "liczba:najstarsza:próg:mint"; brakujące pola (starszy format) = liczone do 0, bez mintu
+        token_count, oldest, checked_up_to, mint = (raw.decode().split(":") + ["0", ""])[:4]
+        value = _decode_dev(int(token_count), float(oldest) if oldest else None, int(checked_up_to or 0), mint)
+        return value, time.time() + max(ttl, 1)
+
+    async def dev_put(self, dev, value, ttl):
+        token_count, oldest, checked_up_to, mint = _encode_dev(value)
+        raw = f"{token_count}:{'' if oldest is None else oldest}:{checked_up_to}:{mint or ''}"
+        await self.client.set(f"{self.prefix}dev:{dev}", raw, ex=max(1, int(ttl)))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_backend(kind, url=None, name="tgbot", max_cas=1_000_000, dev_slots=262_144, ca_ttl=86400):
+    if kind == BACKEND_LOCAL:
+        return None
+    if kind == BACKEND_SHM:
+        return SharedMemoryBackend(name, max_cas=max_cas, dev_slots=dev_slots)
+    if kind == BACKEND_REDIS:
+        return RedisBackend(url or "redis://127.0.0.1:6379/0", prefix=f"{name}:", ca_ttl=ca_ttl)
+    raise ValueError(f"Nieznany backend stanu: {kind}")
+
+
+class SharedState:
+    # Lokalne MintDedup i DevCache jako pierwszy poziom, opcjonalny backend współdzielony jako drugi.
+    # Awaria backendu nie zatrzymuje potoku: mint uznajemy za nowy, dev'a za nieznanego w cache.
+    def __init__(self, seen_cas, dev_cache, backend=None):
+        self.seen_cas = seen_cas
+        self.dev_cache = dev_cache
+        self.backend = backend
+        self.backend_errors = 0
+
+    async def add_seen(self, ca):
+        if not self.seen_cas.add(ca):
+            return False
+        if self.backend is None:
+            return True
+        try:
+            return await self.backend.seen_add(ca)
+        except Exception as e:
+            self.backend_errors += 1
+            log.warning("Backend stanu niedostępny (dedup): %s", e)
+            return True
+
+    async def get_dev(self, dev):
+        value = self.dev_cache.get(dev)
+        if value is not None or self.backend is None:
+            return value
+        try:
+            remote = await self.backend.dev_get(dev)
+        except Exception as e:
+            self.backend_errors += 1
+            log.warning("Backend stanu niedostępny (cache dev'ów): %s", e)
+            return None
+        if remote is None:
+            return None
+        value, expires_at = remote
+        self.dev_cache.put(dev, value, ttl=expires_at - time.time())
+        return value
+
+    async def put_dev(self, dev, value):
+        self.dev_cache.put(dev, value)
+        if self.backend is None:
+            return
+        try:
+            await self.backend.dev_put(dev, value, self.dev_cache.ttl)
+        except Exception as e:
+            self.backend_errors += 1
+            log.warning("Backend stanu niedostępny (zapis dev'a): %s", e)
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
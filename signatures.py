@@ -0,0 +1,74 @@
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# get_emoji_for_time rozróżnia tylko <10 min, <24 h i starsze
+DEFAULT_HORIZON = 86400
+
+
+class SignatureWalker:
+    # Szuka najstarszej transakcji adresu stronami getSignaturesForAddress (kursor `before`).
+    # Kończy, gdy historia jest na pewno starsza niż `horizon` albo gdy się skończy.
+    # Punkt kontrolny na dev'a: (najstarsza sygnatura, jej blockTime, czy wynik ostateczny).
+    def __init__(self, helius, checkpoints, page_limit=1000, max_pages=5, horizon=DEFAULT_HORIZON, clock=time.time):
+        self.helius = helius
+        self.checkpoints = checkpoints
+        self.page_limit = page_limit
+        self.max_pages = max_pages
+        self.horizon = horizon
+        self.clock = clock
+        self.pages_fetched = 0
+        self.checkpoint_hits = 0
+        self.early_exits = 0
+
+    async def oldest_block_time(self, address):
+        cutoff = self.clock() - self.horizon
+        checkpoint = self.checkpoints.get(address)
+        if checkpoint is not None:
+            before, oldest_time, final = checkpoint
+            if final or (oldest_time is not None and oldest_time <= cutoff):
+                self.checkpoint_hits += 1
+                return oldest_time
+        else:
+            before, oldest_time = None, None
+
+        for _ in range(self.max_pages):
+            options = {"limit": self.page_limit}
+            if before:
+                options["before"] = before
+            page = await self.helius.call("getSignaturesForAddress", [address, options])
+            self.pages_fetched += 1
+            if not page:
+                # Pusta pierwsza strona to nie koniec historii – świeży portfel może jeszcze nie mieć
+                # zaindeksowanych transakcji, więc nie zapamiętujemy jej na cały TTL punktów kontrolnych
+                if before:
+                    self.checkpoints.put(address, (before, oldest_time, True))
+                return oldest_time
+
+            before = page[-1].get("signature") or before
+            for entry in reversed(page):
+                if entry.get("blockTime"):
+                    oldest_time = entry["blockTime"]
+                    break
+
+            if len(page) < self.page_limit:
+                self.checkpoints.put(address, (before, oldest_time, True))
+                return oldest_time
+            if oldest_time is not None and oldest_time <= cutoff:
+                self.early_exits += 1
+                self.checkpoints.put(address, (before, oldest_time, False))
+                return oldest_time
+
+        # Limit stron – kolejne zapytanie o tego dev'a zacznie od zapamiętanego kursora
+        log.debug("Historia %s dłuższa niż %d stron, wznowię od %s", address, self.max_pages, before)
+        self.checkpoints.put(address, (before, oldest_time, False))
+        return oldest_time
+
+    def stats(self):
+        return {
+            "pages": self.pages_fetched,
+            "checkpoint_hits": self.checkpoint_hits,
+            "early_exits": self.early_exits,
+            "checkpoints": len(self.checkpoints),
+        }
@@ -0,0 +1,44 @@
+import asyncio
+
+
+class SingleFlight:
+    # Współbieżne wywołania z tym samym kluczem czekają na jedno zadanie i dostają jego wynik (albo wyjątek).
+    # Anulowanie jednego czekającego nie przerywa pozostałych; zadanie jest anulowane dopiero,
+    # gdy nikt już na nie nie czeka.
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.shared = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    async def do(self, key, factory):
+        call = self._calls.get(key)
+        if call is None:
+            call = [asyncio.ensure_future(factory()), 0]
+            self._calls[key] = call
+            call[0].add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.shared += 1
+        call[1] += 1
+        try:
+            return await asyncio.shield(call[0])
+        finally:
+            call[1] -= 1
+            if call[1] == 0 and not call[0].done():
+                # Klucz zwalniamy przed cancel(): kolejny wywołujący musi dostać nowe zadanie,
+                # a nie to już anulowane (zdjęcie z _calls przez callback jest dopiero w następnym obiegu pętli)
+                self._forget(key, call)
+                call[0].cancel()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "started": self.started, "shared": self.shared}
@@ -0,0 +1,171 @@
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import struct
+from urllib.parse import urlsplit, urlunsplit
+
+from dedup import b58encode
+from profiles import TOTAL_SUPPLY
+
+log = logging.getLogger(__name__)
+
+PUMP_PROGRAM_ID = "6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P"
+TOKEN_DECIMALS = 10 ** 6
+LAMPORTS_PER_SOL = 10 ** 9
+# Rezerwy wirtualne świeżej krzywej, gdy w logach nie ma TradeEvent
+INITIAL_VIRTUAL_TOKEN_RESERVES = 1_073_000_000 * TOKEN_DECIMALS
+INITIAL_VIRTUAL_SOL_RESERVES = 30 * LAMPORTS_PER_SOL
+
+CREATE_MARKER = "Instruction: Create"
+DATA_PREFIX = "Program data: "
+
+
+def event_discriminator(name):
+    # Zdarzenia Anchora: pierwsze 8 bajtów sha256("event:<Nazwa>")
+    return hashlib.sha256(f"event:{name}".encode()).digest()[:8]
+
+
+CREATE_EVENT = event_discriminator("CreateEvent")
+TRADE_EVENT = event_discriminator("TradeEvent")
+
+
+def ws_url_from_rpc(url):
+    parts = urlsplit(url)
+    scheme = {"https": "wss", "http": "ws"}.get(parts.scheme, parts.scheme)
+    return urlunsplit((scheme, parts.netloc, parts.path, parts.query, parts.fragment))
+
+
+def logs_subscribe_request(program_id=PUMP_PROGRAM_ID, commitment="processed"):
+    return {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "logsSubscribe",
+        "params": [{"mentions": [program_id]}, {"commitment": commitment}],
+    }
+
+
+class _Reader:
+    def __init__(self, raw, offset=8):
+        self.raw = raw
+        self.offset = offset
+
+    def remaining(self):
+        return len(self.raw) - self.offset
+
+    def _unpack(self, fmt):
+        value = struct.unpack_from(fmt, self.raw, self.offset)[0]
+        self.offset += struct.calcsize(fmt)
+        return value
+
+    def u64(self):
+        return self._unpack("<Q")
+
+    def i64(self):
+        return self._unpack("<q")
+
+    def bool(self):
+        return self._unpack("<?")
+
+    def pubkey(self):
+        value = self.raw[self.offset:self.offset + 32]
+        if len(value) != 32:
+            raise struct.error("za krótki pubkey")
+        self.offset += 32
+        return b58encode(value)
+
+    def string(self):
+        size = self._unpack("<I")
+        value = self.raw[self.offset:self.offset + size]
+        if len(value) != size:
+            raise struct.error("za krótki string")
+        self.offset += size
+        return value.decode("utf-8", errors="replace")
+
+
+def _parse_create(raw):
+    r = _Reader(raw)
+    event = {"name": r.string(), "symbol": r.string(), "uri": r.string(), "mint": r.pubkey(),
+             "bonding_curve": r.pubkey(), "user": r.pubkey()}
+    # Nowsze wersje programu dopisują twórcę, czas i rezerwy; starsze kończą się na user
+    if r.remaining() >= 32 + 8 + 8 + 8:
+        event["creator"] = r.pubkey()
+        event["timestamp"] = r.i64()
+        event["virtual_token_reserves"] = r.u64()
+        event["virtual_sol_reserves"] = r.u64()
+    return event
+
+
+def _parse_trade(raw):
+    r = _Reader(raw)
+    return {"mint": r.pubkey(), "sol_amount": r.u64(), "token_amount": r.u64(), "is_buy": r.bool(),
+            "user": r.pubkey(), "timestamp": r.i64(), "virtual_sol_reserves": r.u64(),
+            "virtual_token_reserves": r.u64()}
+
+
+def decode_create_logs(signature, logs):
+    # Zdarzenie create w kształcie PumpPortal (jak w handle_token) albo None
+    create = None
+    trade = None
+    for line in logs:
+        if not line.startswith(DATA_PREFIX):
+            continue
+        try:
+            raw = base64.b64decode(line[len(DATA_PREFIX):])
+            if raw[:8] == CREATE_EVENT and create is None:
+                create = _parse_create(raw)
+            elif raw[:8] == TRADE_EVENT and trade is None:
+                trade = _parse_trade(raw)
+        except (binascii.Error, struct.error, ValueError) as e:
+            log.debug("Nie udało się zdekodować zdarzenia w %s: %s", signature, e)
+    if create is None:
+        return None
+
+    if trade is not None and trade["mint"] == create["mint"] and trade["is_buy"]:
+        token_amount = trade["token_amount"]
+        sol_amount = trade["sol_amount"]
+        v_tokens = trade["virtual_token_reserves"]
+        v_sol = trade["virtual_sol_reserves"]
+    else:
+        token_amount = 0
+        sol_amount = 0
+        v_tokens = create.get("virtual_token_reserves", INITIAL_VIRTUAL_TOKEN_RESERVES)
+        v_sol = create.get("virtual_sol_reserves", INITIAL_VIRTUAL_SOL_RESERVES)
+
+    v_tokens_ui = v_tokens / TOKEN_DECIMALS
+    v_sol_ui = v_sol / LAMPORTS_PER_SOL
+    return {
+        "signature": signature,
+        "mint": create["mint"],
+        "traderPublicKey": create["user"],
+        "txType": "create",
+        "initialBuy": token_amount / TOKEN_DECIMALS,
+        "solAmount": sol_amount / LAMPORTS_PER_SOL,
+        "bondingCurveKey": create["bonding_curve"],
+        "vTokensInBondingCurve": v_tokens_ui,
+        "vSolInBondingCurve": v_sol_ui,
+        "marketCapSol": v_sol_ui / v_tokens_ui * TOTAL_SUPPLY if v_tokens_ui else 0.0,
+        "name": create["name"],
+        "symbol": create["symbol"],
+        "uri": create["uri"],
+        "pool": "pump",
+    }
+
+
+def is_create_notification(message):
+    # Tani test na surowym tekście, zanim zdekodujemy JSON
+    if isinstance(message, str):
+        return CREATE_MARKER in message
+    return CREATE_MARKER.encode() in message
+
+
+def decode_logs_notification(message):
+    try:
+        payload = json.loads(message)
+        value = payload["params"]["result"]["value"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if value.get("err") is not None:
+        return None
+    return decode_create_logs(value.get("signature"), value.get("logs") or [])
@@ -0,0 +1,174 @@
+import asyncio
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_cas (
+    ca TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dev_cache (
+    dev TEXT PRIMARY KEY,
+    token_count INTEGER NOT NULL,
+    oldest_tx REAL,
+    expires_at REAL NOT NULL,
+    checked_up_to INTEGER NOT NULL DEFAULT 0,
+    mint TEXT
+);
+CREATE TABLE IF NOT EXISTS seen_snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    keys BLOB NOT NULL,
+    last_rowid INTEGER NOT NULL,
+    saved_at REAL NOT NULL
+);
+"""
+
+# Kolumny dopisane później; starsze bazy dostają je przez ALTER TABLE
+DEV_CACHE_COLUMNS = {"checked_up_to": "INTEGER NOT NULL DEFAULT 0", "mint": "TEXT"}
+
+
+class StateStore:
+    # Okno mintów: co `snapshot_interval` zrzut surowych kluczy z `snapshot()` jednym BLOB-em,
+    # a seen_cas jako dziennik – przy starcie wczytujemy zrzut i tylko wiersze dopisane po nim.
+    def __init__(self, path, flush_interval=1.0, max_batch=1000, keep_cas=100_000, snapshot=None,
+                 snapshot_interval=300.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.keep_cas = keep_cas
+        self.snapshot = snapshot
+        self.snapshot_interval = snapshot_interval
+        self._snapshot_at = time.monotonic()
+        self._snapshot_pending = False
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # Zapis idzie przez asyncio.to_thread; anulowanie flush() nie zatrzymuje wątku,
+        # więc kolejny zapis albo zamknięcie połączenia czeka, aż poprzedni skończy transakcję
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(dev_cache)")}
+        for column, definition in DEV_CACHE_COLUMNS.items():
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE dev_cache ADD COLUMN {column} {definition}")
+        self._seen_buffer = []
+        self._dev_buffer = {}
+        self._wakeup = asyncio.Event()
+        self.writes = 0
+        self.write_errors = 0
+        self.snapshots = 0
+
+    def load_seen_snapshot(self):
+        row = self._conn.execute("SELECT keys, last_rowid FROM seen_snapshot WHERE id = 0").fetchone()
+        return (row[0], row[1]) if row else (b"", 0)
+
+    def load_seen_cas(self, limit, after_rowid=0):
+        rows = self._conn.execute(
+            "SELECT ca FROM seen_cas WHERE rowid > ? ORDER BY rowid DESC LIMIT ?", (after_rowid, limit)
+        ).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def load_dev_cache(self, now=None):
+        now = time.time() if now is None else now
+        rows = self._conn.execute(
+            "SELECT dev, token_count, oldest_tx, checked_up_to, mint, expires_at FROM dev_cache WHERE expires_at > ?",
+            (now,),
+        ).fetchall()
+        entries = []
+        for dev, token_count, oldest_tx, checked_up_to, mint, expires_at in rows:
+            oldest_tx_utc = datetime.datetime.fromtimestamp(oldest_tx, datetime.UTC) if oldest_tx is not None else None
+            entries.append((dev, (token_count, oldest_tx_utc, checked_up_to, mint), expires_at))
+        return entries
+
+    def record_seen_ca(self, ca):
+        self._seen_buffer.append((ca, time.time()))
+        self._snapshot_pending = True
+        self._maybe_wake()
+
+    def record_dev(self, dev, value, expires_at):
+        token_count, oldest_tx_utc, checked_up_to, mint = value
+        oldest_tx = oldest_tx_utc.timestamp() if oldest_tx_utc else None
+        self._dev_buffer[dev] = (dev, token_count, oldest_tx, checked_up_to, mint, expires_at)
+        self._maybe_wake()
+
+    def _maybe_wake(self):
+        if len(self._seen_buffer) + len(self._dev_buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _snapshot_due(self, force):
+        if self.snapshot is None or not self._snapshot_pending:
+            return False
+        return force or time.monotonic() - self._snapshot_at >= self.snapshot_interval
+
+    async def flush(self, force_snapshot=False):
+        # Zrzut i zabranie bufora bez await pomiędzy: każdy mint ze zrzutu jest już w bazie
+        # albo w tej samej transakcji, więc last_rowid dzieli dziennik dokładnie w tym miejscu
+        keys = self.snapshot() if self._snapshot_due(force_snapshot) else None
+        if not self._seen_buffer and not self._dev_buffer and keys is None:
+            return
+        seen, self._seen_buffer = self._seen_buffer, []
+        devs, self._dev_buffer = list(self._dev_buffer.values()), {}
+        if keys is not None:
+            self._snapshot_pending = False
+            self._snapshot_at = time.monotonic()
+        try:
+            await asyncio.to_thread(self._write, seen, devs, keys)
+            self.writes += 1
+            if keys is not None:
+                self.snapshots += 1
+        except Exception as e:
+            self.write_errors += 1
+            if keys is not None:
+                self._snapshot_pending = True
+            log.error("Błąd zapisu stanu do %s: %s", self.path, e)
+
+    def _write(self, seen, devs, keys=None):
+        with self._lock:
+            self._write_locked(seen, devs, keys)
+
+    def _write_locked(self, seen, devs, keys):
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("INSERT OR IGNORE INTO seen_cas (ca, seen_at) VALUES (?, ?)", seen)
+            conn.executemany(
+                "INSERT OR REPLACE INTO dev_cache (dev, token_count, oldest_tx, checked_up_to, mint, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                devs,
+            )
+            conn.execute(
+                "DELETE FROM seen_cas WHERE rowid <= (SELECT MAX(rowid) FROM seen_cas) - ?", (self.keep_cas,)
+            )
+            conn.execute("DELETE FROM dev_cache WHERE expires_at <= ?", (time.time(),))
+            if keys is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO seen_snapshot (id, keys, last_rowid, saved_at) "
+                    "VALUES (0, ?, (SELECT COALESCE(MAX(rowid), 0) FROM seen_cas), ?)",
+                    (keys, time.time()),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def close(self):
+        await self.flush(force_snapshot=True)
+        await asyncio.to_thread(self._close)
+
+    def _close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+import metrics
+from rate_limit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+
+class TelegramDispatcher:
+    def __init__(self, bot, global_rate=30.0, chat_rate=20 / 60, chat_burst=3,
+                 max_retries=5, backoff_initial=1.0, backoff_max=60.0,
+                 merge_threshold=5, merge_max=10, max_queue=10_000):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        # 0 wyłącza łączenie alertów w jedną wiadomość
+        self.merge_threshold = merge_threshold
+        self.merge_max = merge_max
+        self.max_queue = max_queue
+        self._queues = {}
+        self._buckets = {}
+        self._workers = {}
+        self._seq = itertools.count()
+        self.enqueued = 0
+        self.sent = 0
+        self.merged = 0
+        self.retries = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def set_rates(self, global_rate=None, chat_rate=None):
+        if global_rate is not None:
+            self.global_bucket.set_rate(global_rate, global_rate)
+        if chat_rate is not None:
+            self.chat_rate = chat_rate
+            for bucket in self._buckets.values():
+                bucket.set_rate(chat_rate)
+
+    def send(self, chat_id, text, priority=0, seen_at=None, **kwargs):
+        # seen_at: chwila odebrania mintu (time.perf_counter), do pomiaru opóźnienia end-to-end
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.PriorityQueue(maxsize=self.max_queue)
+            self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            self._workers[chat_id] = asyncio.create_task(self._worker(chat_id))
+        options = tuple(sorted(kwargs.items()))
+        try:
+            queue.put_nowait((priority, next(self._seq), text, options, seen_at or time.perf_counter()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.warning("Kolejka Telegrama dla %s pełna. Odrzucam wiadomość.", chat_id)
+            return False
+        self.enqueued += 1
+        return True
+
+    def _take_batch(self, queue, first):
+        text, options = first[2], first[3]
+        texts = [text]
+        if not self.merge_threshold or queue.qsize() < self.merge_threshold:
+            return texts, options, [first]
+        items = [first]
+        held = []
+        length = len(text)
+        while len(texts) < self.merge_max and not queue.empty():
+            item = queue.get_nowait()
+            queue.task_done()
+            if item[3] != options or length + 2 + len(item[2]) > TELEGRAM_MAX_MESSAGE_LENGTH:
+                held.append(item)
+                break
+            texts.append(item[2])
+            items.append(item)
+            length += 2 + len(item[2])
+        for item in held:
+            queue.put_nowait(item)
+        return texts, options, items
+
+    async def _worker(self, chat_id):
+        queue = self._queues[chat_id]
+        bucket = self._buckets[chat_id]
+        while True:
+            first = await queue.get()
+            try:
+                texts, options, items = self._take_batch(queue, first)
+                if len(texts) > 1:
+                    self.merged += len(texts) - 1
+                await self._deliver(chat_id, "\n\n".join(texts), dict(options), bucket)
+                delivered_at = time.perf_counter()
+                metrics.ALERTS_SENT.inc(len(items))
+                for item in items:
+                    metrics.ALERT_E2E_LATENCY.observe(delivered_at - item[4])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                metrics.TELEGRAM_ERRORS.inc()
+                log.error("Nie udało się wysłać wiadomości na Telegram do %s: %s", chat_id, e)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, chat_id, text, options, bucket):
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            started = time.perf_counter()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, **options)
+                self.sent += 1
+                metrics.STAGE_LATENCY.labels("telegram_send").observe(time.perf_counter() - started)
+                return
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if hasattr(retry_after, "total_seconds"):
+                    retry_after = retry_after.total_seconds()
+                log.warning("Telegram flood-wait dla %s: czekam %s s", chat_id, retry_after)
+                delay = retry_after
+            except (BadRequest, Forbidden):
+                raise
+            except TelegramError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_initial * 2 ** attempt))
+                log.warning("Błąd Telegrama (%s). Ponawiam za %.1f s", e, delay)
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def queue_depth(self):
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth(),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "merged": self.merged,
+            "retries": self.retries,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    async def close(self, timeout=5.0):
+        if self._queues:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(queue.join() for queue in self._queues.values())), timeout
+                )
+            except asyncio.TimeoutError:
+                log.warning("Niewysłane wiadomości Telegrama: %d", self.queue_depth())
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
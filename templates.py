@@ -0,0 +1,111 @@
+import datetime
+import functools
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = "Europe/Warsaw"
+
+# Wartości parse_mode Bot API
+MARKDOWN = "Markdown"
+MARKDOWN_V2 = "MarkdownV2"
+HTML = "HTML"
+
+# Tablice dla str.translate – szybsze niż re.sub przy krótkich polach
+_MARKDOWN_TABLE = str.maketrans({c: "\\" + c for c in "_*`["})
+_MARKDOWN_V2_TABLE = str.maketrans({c: "\\" + c for c in "_*[]()~`>#+-=|{}.!\\"})
+_MARKDOWN_V2_URL_TABLE = str.maketrans({c: "\\" + c for c in ")\\"})
+_HTML_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
+
+# Jeden układ alertu; wartości w {} są wstawiane już zescape'owane dla danego formatu
+LAYOUTS = {
+    MARKDOWN: (
+        "*new token!*\n\n"
+        "*Nazwa:* {name}\n"
+        "*Symbol:* {symbol}\n"
+        "*CA:* [{ca}]({ca_link})\n"
+        "*Dev:* [Kliknij]({dev_link})\n"
+        "*Data utworzenia:* {created}\n"
+        "*Data ostatniej transakcji:* {last_tx} {emoji}\n"
+        "*Dev deployed:* {deployed}\n"
+        "*Dev initial buy:* {initial_buy}%"
+    ),
+    MARKDOWN_V2: (
+        "*new token\\!*\n\n"
+        "*Nazwa:* {name}\n"
+        "*Symbol:* {symbol}\n"
+        "*CA:* [{ca}]({ca_link})\n"
+        "*Dev:* [Kliknij]({dev_link})\n"
+        "*Data utworzenia:* {created}\n"
+        "*Data ostatniej transakcji:* {last_tx} {emoji}\n"
+        "*Dev deployed:* {deployed}\n"
+        "*Dev initial buy:* {initial_buy}%"
+    ),
+    HTML: (
+        "<b>new token!</b>\n\n"
+        "<b>Nazwa:</b> {name}\n"
+        "<b>Symbol:</b> {symbol}\n"
+        '<b>CA:</b> <a href="{ca_link}">{ca}</a>\n'
+        '<b>Dev:</b> <a href="{dev_link}">Kliknij</a>\n'
+        "<b>Data utworzenia:</b> {created}\n"
+        "<b>Data ostatniej transakcji:</b> {last_tx} {emoji}\n"
+        "<b>Dev deployed:</b> {deployed}\n"
+        "<b>Dev initial buy:</b> {initial_buy}%"
+    ),
+}
+
+URL_FIELDS = ("ca_link", "dev_link")
+
+
+# (tablica dla tekstu, tablica dla URL-i); None = bez escape'owania
+ESCAPES = {
+    MARKDOWN: (_MARKDOWN_TABLE, None),
+    MARKDOWN_V2: (_MARKDOWN_V2_TABLE, _MARKDOWN_V2_URL_TABLE),
+    HTML: (_HTML_TABLE, _HTML_TABLE),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_timezone(name):
+    # ZoneInfoNotFoundError to KeyError – zamieniamy na ValueError jak inne błędy konfiguracji
+    try:
+        return ZoneInfo(name)
+    except ZoneInfoNotFoundError:
+        raise ValueError(f"Nieznana strefa czasowa: {name}") from None
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_minute(minute, tz_name):
+    dt = datetime.datetime.fromtimestamp(minute * 60, get_timezone(tz_name))
+    return dt.strftime("%d-%m-%Y %H:%M")
+
+
+def format_minute(dt, tz_name=DEFAULT_TIMEZONE):
+    # Napis z dokładnością do minuty – wiele alertów w tej samej minucie trafia w cache
+    return _format_minute(int(dt.timestamp() // 60), tz_name)
+
+
+class AlertTemplate:
+    def __init__(self, parse_mode=MARKDOWN, tz_name=DEFAULT_TIMEZONE):
+        if parse_mode not in LAYOUTS:
+            raise ValueError(f"Nieznany format wiadomości: {parse_mode}")
+        self.parse_mode = parse_mode
+        self.tz_name = tz_name
+        get_timezone(tz_name)
+        self._layout = LAYOUTS[parse_mode]
+        self._text_table, self._url_table = ESCAPES[parse_mode]
+
+    def render(self, fields):
+        # Daty (datetime) są formatowane w strefie szablonu, reszta przez str()
+        values = {}
+        for key, value in fields.items():
+            if isinstance(value, datetime.datetime):
+                value = format_minute(value, self.tz_name)
+            else:
+                value = str(value)
+            table = self._url_table if key in URL_FIELDS else self._text_table
+            values[key] = value.translate(table) if table else value
+        return self._layout.format_map(values)
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(parse_mode=MARKDOWN, tz_name=DEFAULT_TIMEZONE):
+    return AlertTemplate(parse_mode, tz_name)
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import unittest
+
+import httpx
+
+from helius import HeliusClient, HeliusUnavailable
+from rate_limit import CircuitBreaker, CreditBudget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def ok(request):
+    body = json.loads(request.content)
+    return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": "ok"})
+
+
+class HalfOpenProbeTest(unittest.IsolatedAsyncioTestCase):
+    # Regresja: próba w stanie półotwartym zakończona bez werdyktu blokowała bezpiecznik na zawsze
+    def make_client(self, handler, budget=None):
+        self.clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=30.0, clock=self.clock)
+        client = HeliusClient("http://helius.test", breaker=breaker, budget=budget, retries=0)
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(client.close)
+        return client
+
+    def half_open(self, client):
+        client.breaker.record_failure()
+        self.clock.now += 31
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+    async def test_cancelled_probe_is_released(self):
+        started = asyncio.Event()
+
+        async def slow(request):
+            started.set()
+            await asyncio.sleep(10)
+
+        client = self.make_client(slow)
+        self.half_open(client)
+        probe = asyncio.create_task(client.call("getBalance", []))
+        await started.wait()
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(ok))
+        self.assertEqual(await client.call("getBalance", []), "ok")
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_budget_rejection_does_not_take_probe(self):
+        budget = CreditBudget(1, clock=FakeClock())
+        client = self.make_client(ok, budget=budget)
+        self.half_open(client)
+        budget.spent = 1
+        with self.assertRaises(HeliusUnavailable):
+            await client.call("getBalance", [])
+        budget.spent = 0
+        self.assertEqual(await client.call("getBalance", []), "ok")
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_http_error_on_probe_is_released(self):
+        responses = [httpx.Response(400, text="bad request")]
+
+        def handler(request):
+            return responses.pop(0) if responses else ok(request)
+
+        client = self.make_client(handler)
+        self.half_open(client)
+        with self.assertRaises(httpx.HTTPStatusError):
+            await client.call("getBalance", [])
+        self.assertEqual(await client.call("getBalance", []), "ok")
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+
+class BatchFailureTest(unittest.IsolatedAsyncioTestCase):
+    # Regresja: paczka 5 wywołań po jednym timeoucie liczyła się jako 5 porażek i otwierała bezpiecznik
+    async def test_timed_out_batch_counts_once(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if len(requests) == 1:
+                raise httpx.ReadTimeout("timeout", request=request)
+            body = json.loads(request.content)
+            if isinstance(body, list):
+                return httpx.Response(200, json=[{"jsonrpc": "2.0", "id": item["id"], "result": "ok"} for item in body])
+            return ok(request)
+
+        breaker = CircuitBreaker(failure_threshold=5, cooldown=30.0)
+        client = HeliusClient(
+            "http://helius.test", batch_window=0.01, breaker=breaker, retries=2, backoff_initial=0.01, backoff_max=0.02,
+        )
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(client.close)
+        results = await asyncio.gather(*(client.call("getBalance", [i]) for i in range(5)))
+        self.assertEqual(results, ["ok"] * 5)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.opens, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+
+from singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(flight.do("dev", work) for _ in range(5)))
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(flight), 0)
+
+    async def test_cancelled_waiter_does_not_affect_others(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        first = asyncio.create_task(flight.do("dev", work))
+        second = asyncio.create_task(flight.do("dev", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, "ok")
+
+    async def test_caller_after_last_waiter_left_gets_fresh_call(self):
+        # Regresja: po anulowaniu ostatniego czekającego klucz zostawał w _calls do następnego obiegu pętli,
+        # a nowy wywołujący dostawał CancelledError, choć sam nie był anulowany
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "fresh"
+
+        first = asyncio.create_task(flight.do("dev", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("dev", work))
+        self.assertEqual(await second, "fresh")
+        self.assertTrue(first.cancelled())
+        self.assertFalse(second.cancelled())
+
+
+if __name__ == "__main__":
+    unittest.main()
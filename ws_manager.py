@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+import random
+import websockets
+
+log = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    def __init__(self, endpoints, on_message, subscribe=(), connections=1,
+                 backoff_initial=0.5, backoff_max=30.0,
+                 ping_interval=20.0, ping_timeout=20.0, stall_timeout=60.0):
+        if not endpoints:
+            raise ValueError("Brak endpointów WebSocket")
+        self.endpoints = list(endpoints)
+        self.on_message = on_message
+        # Lista ramek albo funkcja zwracająca listę – wołana przy każdym (ponownym) połączeniu
+        self.subscribe = subscribe if callable(subscribe) else list(subscribe)
+        self.connections = connections
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.stall_timeout = stall_timeout
+        self.connects = 0
+        self.reconnects = 0
+        self.stalls = 0
+        self.messages = 0
+        self.message_errors = 0
+        self._sockets = set()
+
+    async def run(self):
+        await asyncio.gather(*(self._run_connection(slot) for slot in range(self.connections)))
+
+    def backoff_delay(self, attempt):
+        # Pełny jitter: losowo z [0, min(max, initial * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_initial * 2 ** attempt))
+
+    async def _run_connection(self, slot):
+        attempt = 0
+        endpoint_index = slot % len(self.endpoints)
+        while True:
+            uri = self.endpoints[endpoint_index]
+            try:
+                async with websockets.connect(
+                    uri, ping_interval=self.ping_interval, ping_timeout=self.ping_timeout
+                ) as websocket:
+                    self.connects += 1
+                    log.info("Połączono z %s (połączenie %d) i nasłuchiwanie rozpoczęte...", uri, slot)
+                    subscribe = self.subscribe() if callable(self.subscribe) else self.subscribe
+                    for payload in subscribe:
+                        await websocket.send(json.dumps(payload))
+                    self._sockets.add(websocket)
+
+                    try:
+                        while True:
+                            message = await asyncio.wait_for(websocket.recv(), timeout=self.stall_timeout)
+                            attempt = 0
+                            self.messages += 1
+                            try:
+                                await self.on_message(message, slot)
+                            except Exception as e:
+                                self.message_errors += 1
+                                log.exception("Błąd przy obsłudze wiadomości: %s", e)
+                    finally:
+                        self._sockets.discard(websocket)
+            except asyncio.TimeoutError:
+                self.stalls += 1
+                log.warning("Brak wiadomości z %s od %.0f s. Ponowne łączenie...", uri, self.stall_timeout)
+            except websockets.ConnectionClosed as e:
+                log.warning("Połączenie WebSocket z %s zostało zamknięte (%s). Próba ponownego połączenia...", uri, e)
+            except Exception as e:
+                log.error("Błąd połączenia z %s: %s", uri, e)
+
+            self.reconnects += 1
+            endpoint_index = (endpoint_index + 1) % len(self.endpoints)
+            delay = self.backoff_delay(attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def send(self, payload):
+        # Dodatkowa ramka (np. nowa subskrypcja) na wszystkie otwarte połączenia
+        message = json.dumps(payload)
+        sent = 0
+        for websocket in list(self._sockets):
+            try:
+                await websocket.send(message)
+                sent += 1
+            except websockets.ConnectionClosed:
+                self._sockets.discard(websocket)
+        return sent
+
+    def stats(self):
+        return {
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "stalls": self.stalls,
+            "messages": self.messages,
+            "message_errors": self.message_errors,
+        }